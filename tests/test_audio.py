@@ -0,0 +1,233 @@
+import unittest
+
+# Set PYTHONPATH
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import tempfile
+
+import numpy as np
+import wavio
+import webrtcvad
+
+from transcriptionservice.tools.benchmark_vad import synthetic_speech
+
+# Import what to test
+from transcriptionservice.transcription.utils import audio
+from transcriptionservice.transcription.utils.audio import (
+    chunkSampleRange,
+    getDuration,
+    iterSplitWindows,
+    pcmFingerprint,
+    readWav,
+    splitFile,
+    transcoding,
+    vadCutIndexes,
+)
+
+
+def reference_vad_cut_indexes(
+    audio, sample_rate, chunk_length=0.03, mode=1, min_silence=0.6, max_segment_duration=None
+):
+    """Frame by frame implementation of vadCutIndexes (1.2.11)"""
+    min_silence_frame = min_silence / chunk_length
+    max_speech_frame = max_segment_duration / chunk_length if max_segment_duration else None
+    vad = webrtcvad.Vad()
+    vad.set_mode(mode)
+    chunk_size = int(sample_rate * chunk_length)
+    vad_res = []
+    for start in range(0, len(audio) - chunk_size, chunk_size):
+        buffer = (audio[start : start + chunk_size]).astype(np.int16).tobytes()
+        vad_res.append(vad.is_speech(buffer, sample_rate))
+
+    was_speech = vad_res[0]
+    sil_start_i = 0
+    speech_start_i = 0
+    previous_candidate = None
+    cut_indexes = []
+    for i, is_speech in enumerate(vad_res):
+        if is_speech and not was_speech:
+            candidate = int(np.mean([sil_start_i, i]))
+            is_silence_long = (i - sil_start_i > min_silence_frame)
+            is_speech_long = (max_speech_frame and (i - speech_start_i > max_speech_frame))
+            if is_silence_long or is_speech_long:
+                if is_speech_long and previous_candidate:
+                    candidate = previous_candidate
+                cut_indexes.append(candidate)
+                speech_start_i = candidate
+                previous_candidate = None
+            else:
+                previous_candidate = candidate
+            was_speech = True
+        elif not is_speech and was_speech:
+            was_speech = False
+            sil_start_i = i
+    return (np.array(cut_indexes) * chunk_size).astype(np.int32).tolist()
+
+
+class TestVAD(unittest.TestCase):
+
+    def test_cut_indexes(self):
+        parameters = [
+            {},
+            {"max_segment_duration": 6},
+            {"min_silence": 0.1, "max_segment_duration": 3, "mode": 3},
+            {"min_silence": 2.0},
+        ]
+        for seed in range(3):
+            signal = synthetic_speech(120, seed=seed)
+            for kwargs in parameters:
+                expected = reference_vad_cut_indexes(signal, 16000, **kwargs)
+                self.assertGreater(len(expected), 0)
+                self.assertEqual(vadCutIndexes(signal, 16000, **kwargs), expected)
+
+    def test_cut_indexes_block_boundaries(self):
+        signal = synthetic_speech(60, seed=3)
+        expected = reference_vad_cut_indexes(signal, 16000, max_segment_duration=4)
+        block_frames = audio.VAD_BLOCK_FRAMES
+        try:
+            for audio.VAD_BLOCK_FRAMES in [1, 2, 7, 100]:
+                self.assertEqual(
+                    vadCutIndexes(signal, 16000, max_segment_duration=4), expected
+                )
+        finally:
+            audio.VAD_BLOCK_FRAMES = block_frames
+
+    def test_energy_cut_indexes(self):
+        for seed in range(3):
+            signal = synthetic_speech(120, seed=seed)
+            cut_indexes = vadCutIndexes(signal, 16000, method="Energy")
+            self.assertGreater(len(cut_indexes), 0)
+            # Cuts are located in silences, and close to WebRTC ones
+            for cut_index in cut_indexes:
+                self.assertLess(np.abs(signal[cut_index - 480 : cut_index + 480]).max(), 1000)
+            for cut_index in reference_vad_cut_indexes(signal, 16000):
+                self.assertLess(min(abs(cut_index - i) for i in cut_indexes), 16000 * 0.5)
+
+
+class TestWav(unittest.TestCase):
+
+    def test_read_wav(self):
+        rng = np.random.default_rng(0)
+        with tempfile.TemporaryDirectory() as folder:
+            file_path = os.path.join(folder, "audio.wav")
+            for sample_width, channels in [(2, 1), (2, 2), (4, 1)]:
+                data = rng.integers(-1000, 1000, (16011, channels))
+                wavio.write(file_path, data, 16000, sampwidth=sample_width)
+                samples, sample_rate = readWav(file_path)
+                self.assertIsInstance(samples, np.memmap)
+                self.assertEqual(sample_rate, 16000)
+                np.testing.assert_array_equal(
+                    np.squeeze(wavio.read(file_path).data), samples
+                )
+                self.assertEqual(getDuration(file_path), 16011 / 16000)
+                del samples
+
+    def test_duration_header_only(self):
+        with tempfile.TemporaryDirectory() as folder:
+            file_path = os.path.join(folder, "audio.wav")
+            wavio.write(file_path, np.zeros(16000, dtype=np.int16), 16000)
+            # Declare 10 hours of samples in a sparse file
+            num_bytes = 10 * 3600 * 16000 * 2
+            with open(file_path, "r+b") as f:
+                f.seek(40)
+                f.write(num_bytes.to_bytes(4, "little"))
+                f.truncate(44 + num_bytes)
+            self.assertEqual(getDuration(file_path), 10 * 3600)
+
+    def test_read_wav_invalid(self):
+        with tempfile.NamedTemporaryFile(suffix=".wav") as f:
+            f.write(b"ID3" + bytes(100))
+            f.flush()
+            self.assertRaises(ValueError, readWav, f.name)
+
+    def test_transcoding_skip(self):
+        data = np.arange(-8000, 8000, dtype=np.int16)
+        with tempfile.TemporaryDirectory() as folder:
+            file_path = os.path.join(folder, "audio.wav")
+            wavio.write(file_path, data, 16000)
+            inode = os.stat(file_path).st_ino
+            output_path = transcoding(file_path, cleanup=False)
+            self.assertEqual(output_path, os.path.join(folder, "_audio.wav"))
+            self.assertEqual(os.stat(output_path).st_ino, inode)
+            self.assertTrue(os.path.isfile(file_path))
+            output_path = transcoding(file_path)
+            self.assertEqual(os.stat(output_path).st_ino, inode)
+            self.assertFalse(os.path.isfile(file_path))
+            np.testing.assert_array_equal(readWav(output_path)[0], data)
+
+    def test_transcoding_streamed_header(self):
+        data = np.arange(-8000, 8000, dtype=np.int16)
+        with tempfile.TemporaryDirectory() as folder:
+            file_path = os.path.join(folder, "audio.wav")
+            wavio.write(file_path, data, 16000)
+            self.assertTrue(audio._isTargetFormat(file_path, 16000, 1))
+            # Unknown data size of streamed files, and data size larger than the file
+            for data_size in [0, 0xFFFFFFFF, 2 * len(data) + 2]:
+                wavio.write(file_path, data, 16000)
+                with open(file_path, "r+b") as f:
+                    f.seek(40)
+                    f.write(data_size.to_bytes(4, "little"))
+                self.assertEqual(readWav(file_path)[0].shape, data.shape)
+                self.assertFalse(audio._isTargetFormat(file_path, 16000, 1))
+
+    def test_pcm_fingerprint(self):
+        data = np.arange(-8000, 8000, dtype=np.int16)
+        with tempfile.TemporaryDirectory() as folder:
+            file_path = os.path.join(folder, "audio.wav")
+            tagged_path = os.path.join(folder, "tagged.wav")
+            wavio.write(file_path, data, 16000)
+            # Same samples with a metadata chunk between fmt and data
+            with open(file_path, "rb") as f:
+                content = f.read()
+            tag = b"LIST" + (10).to_bytes(4, "little") + b"INFOtitle!"
+            with open(tagged_path, "wb") as f:
+                f.write(content[:36] + tag + content[36:])
+            self.assertEqual(pcmFingerprint(file_path), pcmFingerprint(tagged_path))
+            wavio.write(tagged_path, data[::-1], 16000)
+            self.assertNotEqual(pcmFingerprint(file_path), pcmFingerprint(tagged_path))
+
+
+class TestSplit(unittest.TestCase):
+
+    def test_chunk_references(self):
+        with tempfile.TemporaryDirectory() as folder:
+            file_path = os.path.join(folder, "audio.wav")
+            signal = synthetic_speech(60, seed=4)
+            wavio.write(file_path, signal, 16000)
+            subfiles, _ = splitFile(file_path, max_segment_duration=10)
+            references, _ = splitFile(file_path, max_segment_duration=10, write_subfiles=False)
+            self.assertGreater(len(subfiles), 1)
+            self.assertEqual(os.listdir(folder).count("audio.wav"), 1)
+            self.assertEqual(len(os.listdir(folder)), len(subfiles) + 1)
+            self.assertEqual(len(references), len(subfiles))
+            for (subfile_path, _, _), (reference_path, offset, duration) in zip(subfiles, references):
+                self.assertEqual(reference_path, file_path)
+                start, end = chunkSampleRange(offset, duration, 16000)
+                np.testing.assert_array_equal(readWav(subfile_path)[0], signal[start:end])
+
+    def test_balance_cut_indexes(self):
+        rng = np.random.default_rng(0)
+        cut_indexes = np.cumsum(rng.uniform(1, 8, 200)).astype(int).tolist()
+        num_samples = cut_indexes.pop() + 3
+        for target, max_segment in [(60, None), (60, 62), (5, None), (10000, None)]:
+            balanced = list(audio._balanceCutIndexes(iter(cut_indexes), target, num_samples, max_segment))
+            self.assertTrue(set(balanced) <= set(cut_indexes))
+            durations = np.diff([0] + balanced + [num_samples])
+            self.assertTrue(all(abs(d - target) <= 8 for d in durations[:-1]))
+            if max_segment:
+                self.assertTrue(all(d <= max_segment for d in durations[:-1]))
+        self.assertEqual(list(audio._balanceCutIndexes(iter([]), 60, 100)), [])
+
+    def test_split_windows(self):
+        with tempfile.TemporaryDirectory() as folder:
+            file_path = os.path.join(folder, "audio.wav")
+            wavio.write(file_path, np.zeros(16000 * 25, dtype=np.int16), 16000)
+            windows = list(iterSplitWindows(file_path, 10, 2, write_subfiles=False))
+            self.assertEqual([(offset, duration) for _, offset, duration in windows], [(0, 10), (8, 10), (16, 9)])
+            windows = list(iterSplitWindows(file_path, 30, 2))
+            self.assertEqual(windows, [(file_path, 0.0, 25.0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,170 @@
+import json
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+# Set PYTHONPATH
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+# Import what to test
+from transcriptionservice.broker import discovery
+from transcriptionservice.broker.discovery import Service, ServiceRegistry, list_available_services, prettyfy
+
+
+class FakeIndex:
+    """Mimics redis ft() search paging over registry documents"""
+
+    def __init__(self, docs: list):
+        self.docs = docs
+        self.calls = 0
+
+    def search(self, query):
+        self.calls += 1
+        offset, num = query._offset, query._num
+        return SimpleNamespace(docs=self.docs[offset : offset + num], total=len(self.docs))
+
+
+def service_doc(
+    service_name: str, service_type: str, host_name: str, language: str = "fr-FR", last_alive: float = 0
+):
+    service_info = {
+        "service_name": service_name,
+        "service_type": service_type,
+        "service_language": language,
+        "queue_name": service_name,
+        "version": "1",
+        "info": "",
+        "last_alive": last_alive,
+        "concurrency": 1,
+    }
+    return SimpleNamespace(id=f"service:{host_name}", json=json.dumps(service_info))
+
+
+class TestListServices(unittest.TestCase):
+
+    def test_single_search(self):
+        docs = [service_doc("diar", "diarization", f"diar-{i}") for i in range(5)]
+        docs += [
+            service_doc("punct", "punctuation", "punct-0"),
+            service_doc("punct-en", "punctuation", "punct-1", language="en-US"),
+            service_doc("other", "other", "other-0"),
+        ]
+        index = FakeIndex(docs)
+        client = mock.Mock()
+        client.ft.return_value = index
+        with mock.patch.object(discovery, "_registry_client", return_value=client), mock.patch.object(
+            discovery, "LANGUAGE", "fr-FR"
+        ), mock.patch.object(discovery, "SEARCH_PAGE_SIZE", 3):
+            services = list_available_services()
+        self.assertEqual(index.calls, 3)
+        self.assertEqual(list(services["diarization"]), ["diar"])
+        self.assertEqual(len(services["diarization"]["diar"].instances), 5)
+        self.assertEqual(list(services["punctuation"]), ["punct"])
+
+    def test_heartbeat_liveness(self):
+        now = time.time()
+        docs = [
+            service_doc("diar", "diarization", "diar-0", last_alive=now - 10),
+            service_doc("diar", "diarization", "diar-1", last_alive=now - 100),
+            service_doc("punct", "punctuation", "punct-0", last_alive=now - 1000),
+        ]
+        client = mock.Mock()
+        client.ft.return_value = FakeIndex(docs)
+        with mock.patch.object(discovery, "_registry_client", return_value=client), mock.patch.object(
+            discovery, "LANGUAGE", "fr-FR"
+        ), mock.patch.object(discovery, "HEARTBEAT_WINDOW", 60), mock.patch.object(
+            discovery, "celery"
+        ) as celery:
+            services = list_available_services(ensure_alive=True)
+        celery.control.inspect.assert_not_called()
+        client.delete.assert_called_once_with("service:diar-1", "service:punct-0")
+        self.assertEqual(
+            [instance["host_name"] for instance in services["diarization"]["diar"].instances], ["diar-0"]
+        )
+        self.assertEqual(services["punctuation"], {})
+
+
+class FakeRedis:
+    """Mimics redis get and set with nx and px options, time is advanced manually"""
+
+    def __init__(self):
+        self.values = {}
+        self.now = 0.0
+
+    def get(self, key):
+        value, expire_at = self.values.get(key, (None, None))
+        if expire_at is not None and self.now >= expire_at:
+            return None
+        return value
+
+    def set(self, key, value, nx: bool = False, px: int = None):
+        if nx and self.get(key) is not None:
+            return None
+        self.values[key] = (value, None if px is None else self.now + px / 1000)
+        return True
+
+
+class TestServiceRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.client = FakeRedis()
+        service = Service("diar", "diarization", "*", "diar_queue", "")
+        service.add_instance(
+            {"last_alive": 0, "version": "1", "concurrency": 2}, "service:diar-0"
+        )
+        self.services = {"diarization": {"diar": service}, "punctuation": {}}
+        for patcher in [
+            mock.patch.object(discovery, "_registry_client", return_value=self.client),
+            mock.patch.object(discovery, "list_available_services", side_effect=self.list_available_services),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.calls = []
+
+    def list_available_services(self, ensure_alive: bool = False, as_json: bool = False) -> dict:
+        self.calls.append(ensure_alive)
+        return self.services
+
+    def test_shared_snapshot(self):
+        # Processes share the snapshot: a single one checks liveness
+        registries = [ServiceRegistry(ttl=30), ServiceRegistry(ttl=30)]
+        self.assertIs(registries[0].get(), self.services)
+        self.assertEqual(registries[1].get(as_json=True), prettyfy(self.services))
+        self.assertEqual(registries[1].get()["diarization"]["diar"].concurrency, 2)
+        self.assertEqual(self.calls, [True])
+
+        # After expiry, the first access refreshes the snapshot
+        self.client.now += 30
+        registries[1].get()
+        registries[0].get()
+        self.assertEqual(self.calls, [True, True])
+
+    def test_refresh_in_progress(self):
+        self.client.set(discovery.SNAPSHOT_LOCK_KEY, 1, nx=True, px=30000)
+        registry = ServiceRegistry(ttl=30)
+        # No copy yet: services are listed without liveness check
+        self.assertIs(registry.get(), self.services)
+        self.assertEqual(self.calls, [False])
+        # The last copy is used until the snapshot is available
+        registry.get()
+        self.assertEqual(self.calls, [False])
+
+    def test_refresh(self):
+        registry = ServiceRegistry(ttl=30)
+        registry.get()
+        registry.refresh()
+        self.assertEqual(self.calls, [True, True])
+        registry.get()
+        self.assertEqual(self.calls, [True, True])
+
+    def test_no_cache(self):
+        registry = ServiceRegistry(ttl=0)
+        registry.get()
+        registry.get()
+        self.assertEqual(self.calls, [True, True])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import json
+import unittest
+from unittest import mock
+
+# Set PYTHONPATH
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+os.environ.setdefault("MONGO_PORT", "27017")
+os.environ.setdefault("SERVICE_NAME", "stt")
+
+from celery.result import states as task_states
+
+# Import what to test
+from transcriptionservice.server import ingress
+
+
+class TestJobStatus(unittest.TestCase):
+
+    def setUp(self):
+        task = mock.Mock(state=task_states.STARTED, info={"steps": {}})
+        self.db_client = mock.Mock()
+        self.db_client.fetch_partial_transcription.return_value = {"words": [{"word": "a"}, {"word": "b"}]}
+        for patcher in [
+            mock.patch.object(ingress, "AsyncResult", return_value=task),
+            mock.patch.object(ingress, "db_client", self.db_client, create=True),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.client = ingress.app.test_client()
+
+    def test_partial_transcription(self):
+        for query in ["?partial=1", "?partial=true", "?partial=True"]:
+            response = self.client.get(f"/job/jobid{query}")
+            self.assertEqual(response.status_code, 202)
+            self.assertEqual(json.loads(response.data)["partial_transcription"], "a b")
+        for query in ["", "?partial=0", "?partial=false"]:
+            response = self.client.get(f"/job/jobid{query}")
+            self.assertEqual(response.status_code, 202)
+            self.assertNotIn("partial_transcription", json.loads(response.data))
+        self.assertEqual(self.db_client.fetch_partial_transcription.call_count, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
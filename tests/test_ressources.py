@@ -0,0 +1,62 @@
+import hashlib
+import io
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+# Set PYTHONPATH
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+from flask import Flask, request
+
+# Import what to test
+from transcriptionservice.server.utils.ressources import RessourceUploadRequest, rename_ressource
+
+
+class TestUpload(unittest.TestCase):
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+
+        class UploadRequest(RessourceUploadRequest):
+            ressource_folder = self.folder.name
+
+        self.app = Flask(__name__)
+        self.app.request_class = UploadRequest
+
+        @self.app.route("/upload", methods=["POST"])
+        def upload():
+            audio = request.files["file"]
+            timestamps = request.files["timestamps"].read()
+            file_path = rename_ressource(audio.stream.file_path, audio.stream.hexdigest(), "wav")
+            return {"file_path": file_path, "timestamps": timestamps.decode("utf-8")}
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_upload_written_in_folder(self):
+        content = os.urandom(3 << 20)
+        # Werkzeug would spool the upload in a temporary file
+        with mock.patch("werkzeug.wrappers.request.default_stream_factory") as default_stream_factory:
+            response = self.app.test_client().post(
+                "/upload",
+                data={
+                    "file": (io.BytesIO(content), "audio.wav"),
+                    "timestamps": (io.BytesIO(b"0 1 spk1"), "timestamps.txt"),
+                },
+            )
+        default_stream_factory.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        md5 = hashlib.md5(content).hexdigest()
+        self.assertEqual(response.json["file_path"], os.path.join(self.folder.name, f"{md5}.wav"))
+        self.assertEqual(response.json["timestamps"], "0 1 spk1")
+        # Files that were not renamed are removed with the request
+        self.assertEqual(os.listdir(self.folder.name), [f"{md5}.wav"])
+        with open(response.json["file_path"], "rb") as f:
+            self.assertEqual(f.read(), content)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+from unittest import mock
+
+# Set PYTHONPATH
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+# Import what to test
+from transcriptionservice.broker.discovery import Service
+from transcriptionservice.transcription.utils import serviceresolve
+from transcriptionservice.transcription.utils.serviceresolve import ServiceResolver
+
+
+def make_service(service_name: str, concurrencies: list) -> Service:
+    service = Service(service_name, "diarization", "*", f"{service_name}_queue", "")
+    for i, concurrency in enumerate(concurrencies):
+        service.add_instance(
+            {"last_alive": 0, "version": "1", "concurrency": concurrency},
+            f"service:{service_name}-{i}",
+        )
+    return service
+
+
+class TestLoadPolicy(unittest.TestCase):
+
+    def resolve(self, services: dict, pending: dict) -> str:
+        with mock.patch.dict(os.environ, {"RESOLVE_POLICY": "load"}), mock.patch.object(
+            serviceresolve.service_registry,
+            "get",
+            return_value={"diarization": services, "punctuation": {}},
+        ), mock.patch.object(serviceresolve, "queue_lengths", return_value=pending):
+            return ServiceResolver()._resolve_load("diarization").service_name
+
+    def test_spare_capacity(self):
+        services = {
+            "diar-1": make_service("diar-1", [2]),
+            "diar-2": make_service("diar-2", [2, 4]),
+        }
+        self.assertEqual(self.resolve(services, {"diar-1_queue": 0, "diar-2_queue": 0}), "diar-2")
+        self.assertEqual(self.resolve(services, {"diar-1_queue": 0, "diar-2_queue": 5}), "diar-1")
+        self.assertEqual(self.resolve(services, {"diar-1_queue": 3, "diar-2_queue": 6}), "diar-2")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,241 @@
+import copy
+import functools
+import unittest
+
+# Set PYTHONPATH
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+
+import numpy as np
+
+from transcriptionservice.tools.benchmark_diarization import word_segment_indexes_sequential
+
+# Import what to test
+from transcriptionservice.transcription.transcription_result import (
+    SpeechSegment,
+    TranscriptionResult,
+    Word,
+    WordTable,
+)
+
+
+def chunk_transcription(words: list, offset: float, start: float, end: float) -> dict:
+    """Returns the transcription of the [start, end[ window of a list of (word, start, end) absolute timestamps"""
+    return {
+        "words": [
+            {"word": word, "start": w_start - offset, "end": w_end - offset, "conf": 1.0}
+            for word, w_start, w_end in words
+            if w_start >= start and w_end <= end
+        ]
+    }
+
+
+class TestOverlap(unittest.TestCase):
+
+    def test_resolve_overlaps(self):
+        words = [(f"w{i}", i * 0.5, i * 0.5 + 0.4) for i in range(60)]
+        # 10s windows overlapping over 2s
+        transcriptions = [
+            (chunk_transcription(words, offset, offset, offset + 10), offset)
+            for offset in [0.0, 8.0, 16.0, 24.0]
+        ]
+        result = TranscriptionResult(transcriptions, overlap=2.0)
+        self.assertEqual([w.word for w in result.words], [word for word, _, _ in words])
+        self.assertEqual([w.start for w in result.words], [start for _, start, _ in words])
+
+    def test_shifted_duplicate(self):
+        transcriptions = [
+            ({"words": [{"word": "a", "start": 8.5, "end": 9.1, "conf": 1.0}]}, 0.0),
+            ({"words": [{"word": "a", "start": 0.95, "end": 1.35, "conf": 1.0}]}, 8.0),
+        ]
+        result = TranscriptionResult(transcriptions, overlap=2.0)
+        self.assertEqual([w.word for w in result.words], ["a"])
+
+    def test_no_overlap(self):
+        transcriptions = [
+            ({"words": [{"word": "a", "start": 9.5, "end": 9.9, "conf": 1.0}]}, 0.0),
+            ({"words": [{"word": "b", "start": 0.1, "end": 0.2, "conf": 1.0}]}, 8.0),
+        ]
+        result = TranscriptionResult(transcriptions)
+        self.assertEqual([w.word for w in result.words], ["b", "a"])
+
+
+class TestAccumulator(unittest.TestCase):
+
+    def test_add_transcriptions(self):
+        words = [(f"w{i}", i * 0.5, i * 0.5 + 0.4) for i in range(60)]
+        for overlap, offsets in [(2.0, [0.0, 8.0, 16.0, 24.0]), (0.0, [0.0, 10.0, 20.0])]:
+            transcriptions = [
+                (chunk_transcription(words, offset, offset, offset + 10), offset) for offset in offsets
+            ]
+            result = TranscriptionResult(None)
+            for transcription, offset in transcriptions[::-1]:
+                result.addTranscription(transcription, offset)
+                partial_words = result.partial_words(overlap)
+                self.assertTrue(all(a.start <= b.start for a, b in zip(partial_words, partial_words[1:])))
+            self.assertEqual(partial_words.words, [word for word, _, _ in words])
+            result.mergeTranscriptions(overlap=overlap)
+            self.assertEqual(result.words, TranscriptionResult(transcriptions, overlap=overlap).words)
+            self.assertEqual(result.words, partial_words)
+
+    def test_speaker_ids(self):
+        result = TranscriptionResult(None)
+        result.addTranscription({"words": [{"word": "b", "start": 0.0, "end": 0.5, "conf": 1.0}]}, 5.0)
+        result.addTranscription({"words": [{"word": "a", "start": 0.0, "end": 0.5, "conf": 1.0}]}, 0.0)
+        result.mergeTranscriptions(["s0", "s1"])
+        self.assertEqual([(s.speaker_id, s.raw_segment) for s in result.segments], [("s0", "a"), ("s1", "b")])
+        self.assertEqual(result.partial_words(), WordTable())
+
+    def test_same_offset_speaker_ids(self):
+        # Overlapping speaker turns: speakers follow the dispatch order, not the completion order
+        for completion_order in [[0, 1, 2], [2, 1, 0], [1, 2, 0]]:
+            result = TranscriptionResult(None)
+            for index in completion_order:
+                word = {"word": f"w{index}", "start": 0.0, "end": 0.5, "conf": 1.0}
+                result.addTranscription({"words": [word]}, [0.0, 3.0, 3.0][index], index)
+            result.mergeTranscriptions(["s0", "s1", "s2"])
+            self.assertEqual(
+                [(s.speaker_id, s.raw_segment) for s in result.segments], [("s0", "w0"), ("s1", "w1"), ("s2", "w2")]
+            )
+
+
+class TestWordTable(unittest.TestCase):
+
+    def test_merge(self):
+        transcriptions = [
+            ({"words": [{"word": "c", "start": 1.0, "end": 1.5, "conf": 0.5}]}, 10.0),
+            ({"words": [{"word": "a", "start": 0.0, "end": 0.5, "conf": 1.0},
+                        {"word": "b", "start": 1.0, "end": 1.5, "conf": 0.0}]}, 0.0),
+        ]
+        result = TranscriptionResult(transcriptions, spk_ids=["s1", "s0"])
+        self.assertIsInstance(result.words, WordTable)
+        self.assertEqual(result.words.json, [
+            {"word": "a", "start": 0.0, "end": 0.5, "conf": 1.0},
+            {"word": "b", "start": 1.0, "end": 1.5, "conf": 0.0},
+            {"word": "c", "start": 11.0, "end": 11.5, "conf": 0.5},
+        ])
+        self.assertEqual(result.transcription_confidence, 0.5)
+        self.assertEqual([(s.speaker_id, s.raw_segment, s.start, s.end) for s in result.segments],
+                         [("s0", "a b", 0.0, 1.5), ("s1", "c", 11.0, 11.5)])
+
+    def test_views(self):
+        table = WordTable.fromDicts([{"word": "a", "start": 0, "end": 1, "conf": 1}], offset=2.0)
+        table += [Word("b", 3.0, 4.0, 0.5)]
+        table.append(Word("c", 1.0, 1.5, 0.5))
+        self.assertEqual(len(table), 3)
+        self.assertEqual(table[-1], Word("c", 1.0, 1.5, 0.5))
+        self.assertRaises(IndexError, table.__getitem__, 3)
+        table[0].apply_offset(1.0)
+        self.assertEqual(table[0].json, {"word": "a", "start": 3.0, "end": 4.0, "conf": 1.0})
+        table.sort()
+        self.assertEqual(table.words, ["c", "a", "b"])
+        sliced = table[1:]
+        sliced[0].word = "d"
+        self.assertEqual([w.word for w in sliced], ["d", "b"])
+        self.assertEqual(table.words, ["c", "a", "b"])
+
+    def test_merge_tables(self):
+        rng = np.random.default_rng(0)
+        for _ in range(200):
+            tables = []
+            for _ in range(rng.integers(0, 6)):
+                # Sorted or unsorted chunks, overlapping or not, with ties
+                starts = rng.integers(0, 10, rng.integers(0, 12)) + rng.integers(0, 40)
+                if rng.random() < 0.8:
+                    starts = np.sort(starts)
+                tables.append(WordTable([f"w{i}" for i in range(len(starts))], starts, starts + 0.5, np.ones(len(starts))))
+            inputs = [table.json for table in tables]
+            expected = WordTable.concatenate(tables)
+            order = np.argsort(expected.starts, kind="stable")
+            merged = WordTable.merge(tables)
+            self.assertEqual(merged.words, [expected.words[i] for i in order])
+            np.testing.assert_array_equal(merged.starts, expected.starts[order])
+            self.assertEqual([table.json for table in tables], inputs)
+
+    def test_from_dict(self):
+        transcriptions = [
+            ({"words": [{"word": "b", "start": 1.0, "end": 1.5, "conf": 0.5}]}, 0.0),
+            ({"words": [{"word": "a", "start": 0.0, "end": 0.5, "conf": 1.0}]}, 0.0),
+        ]
+        result = TranscriptionResult(transcriptions, spk_ids=["s1", "s0"])
+        final_result = result.final_result()
+        restored = TranscriptionResult.fromDict(final_result)
+        self.assertEqual(restored.words, result.words)
+        self.assertEqual(restored.final_result(), final_result)
+
+
+class TestSpeechSegment(unittest.TestCase):
+
+    def test_cached_bounds_and_text(self):
+        segment = SpeechSegment("s0")
+        self.assertEqual((segment.start, segment.end, segment.raw_segment), (0.0, 0.0, ""))
+        segment.words = WordTable.fromDicts([
+            {"word": "b", "start": 2.0, "end": 2.5, "conf": 1.0},
+            {"word": "a", "start": 1.0, "end": 1.5, "conf": 1.0},
+            {"word": "c", "start": 3.0, "end": 3.5, "conf": 1.0},
+        ])
+        self.assertEqual((segment.start, segment.end, segment.duration), (1.0, 3.5, 2.5))
+        self.assertEqual(segment.raw_segment, "b a c")
+        # In place modifications are detected
+        segment.words[2].word = "d"
+        segment.words.apply_offset(1.0)
+        self.assertEqual((segment.start, segment.end, segment.raw_segment), (2.0, 4.5, "b a d"))
+        segment.words.append(Word("e", 5.0, 6.0, 1.0))
+        self.assertEqual((segment.end, segment.raw_segment), (6.0, "b a d e"))
+        segment.words.sort()
+        self.assertEqual(segment.raw_segment, "a b d e")
+        segment.words = WordTable()
+        self.assertEqual((segment.start, segment.end, segment.raw_segment), (0.0, 0.0, ""))
+
+
+    def test_extend(self):
+        segment = SpeechSegment("s0")
+        segment.append(Word("b", 2.0, 2.5, 1.0))
+        self.assertEqual((segment.start, segment.end, segment.raw_segment), (2.0, 2.5, "b"))
+        segment.extend([Word("a", 1.0, 1.5, 1.0), Word("c", 3.0, 3.5, 1.0)])
+        # Cached values are updated from the new words
+        self.assertEqual((segment._bounds, segment._joined_words), ((1.0, 3.5), "b a c"))
+        self.assertEqual((segment.start, segment.end, segment.raw_segment), (1.0, 3.5, "b a c"))
+        segment.extend(WordTable())
+        self.assertEqual(segment.words.words, ["b", "a", "c"])
+        segment.invalidate()
+        self.assertEqual((segment.start, segment.end, segment.raw_segment), (1.0, 3.5, "b a c"))
+
+
+def random_diarization_inputs(num_words: int, num_turns: int, seed: int):
+    """Returns words and diarization segments with gaps, overlaps, punctuations, long and reversed words"""
+    rng = np.random.default_rng(seed)
+    starts = np.round(np.sort(rng.uniform(0, num_words * 0.4, num_words)), 2)
+    durations = np.round(rng.choice([0.1, 0.3, 0.5, 3.0, -0.1], num_words, p=[0.3, 0.3, 0.3, 0.05, 0.05]), 2)
+    words = [
+        {"word": f"w{i}" + rng.choice(["", "", ".", "?"]), "start": float(start), "end": float(start + duration), "conf": 1.0}
+        for i, (start, duration) in enumerate(zip(starts, durations))
+    ]
+    begins = np.round(rng.uniform(0, num_words * 0.4, num_turns), 2)
+    segments = [
+        {"seg_begin": float(begin), "seg_end": float(begin + rng.uniform(0.2, 10)), "spk_id": int(rng.integers(3)), "seg_id": i}
+        for i, begin in enumerate(begins)
+    ]
+    return words, {"segments": segments}
+
+
+class TestDiarization(unittest.TestCase):
+
+    def test_word_segment_indexes(self):
+        for seed in range(50):
+            num_words, num_turns = [(200, 30), (200, 1), (0, 5), (1, 5), (30, 200)][seed % 5]
+            words, diarization = random_diarization_inputs(num_words, num_turns, seed)
+            result = TranscriptionResult([({"words": words}, 0.0)])
+            result.setDiarizationResult(copy.deepcopy(diarization))
+            np.testing.assert_array_equal(
+                result._wordSegmentIndexes(), word_segment_indexes_sequential(result)
+            )
+            reference = TranscriptionResult([({"words": words}, 0.0)])
+            reference._wordSegmentIndexes = functools.partial(word_segment_indexes_sequential, reference)
+            reference.setDiarizationResult(copy.deepcopy(diarization))
+            self.assertEqual(result.final_result(), reference.final_result())
+            self.assertEqual(sum(len(s.words) for s in result.segments), num_words)
+
+
+if __name__ == '__main__':
+    unittest.main()
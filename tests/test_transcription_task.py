@@ -0,0 +1,495 @@
+import tempfile
+import unittest
+from unittest import mock
+
+# Set PYTHONPATH
+import sys, os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
+os.environ.setdefault("MONGO_PORT", "27017")
+os.environ.setdefault("SERVICE_NAME", "stt")
+
+import numpy as np
+import wavio
+from celery.canvas import Signature, _chord
+
+# Import what to test
+from transcriptionservice.server.mongodb.db_client import DBClient
+from transcriptionservice.transcription import transcription_task
+from transcriptionservice.transcription.configs.transcriptionconfig import TranscriptionConfig
+from transcriptionservice.transcription.transcription_task import (
+    _event_workflow,
+    _iter_batches,
+    _pcm_hash,
+    _result_key,
+    transcription_chunk_cache_task,
+    transcription_cleanup_task,
+    transcription_merge_task,
+)
+from transcriptionservice.transcription.utils.taskprogression import (
+    StepState,
+    TaskProgression,
+)
+
+
+def chunk_transcription(*words) -> dict:
+    """Returns a transcribe_task result of (word, start, end) relative to the chunk"""
+    return {"words": [{"word": word, "start": start, "end": end, "conf": 1.0} for word, start, end in words]}
+
+
+class FakeJob:
+    """Completed transcribe_task"""
+
+    def __init__(self, job_id: str, result: dict = None, error: Exception = None):
+        self.id = job_id
+        self.result = result if error is None else error
+        self.error = error
+
+    def ready(self) -> bool:
+        return True
+
+    def successful(self) -> bool:
+        return self.error is None
+
+    def revoke(self):
+        pass
+
+
+class FakeResultSet:
+    """Yields the results of jobs in order, raising on the first failed job"""
+
+    def __init__(self, jobs: list):
+        self.jobs = jobs
+
+    def join_native(self, callback, disable_sync_subtasks: bool = True):
+        for job in self.jobs:
+            if job.error is not None:
+                raise job.error
+            callback(job.id, job.result)
+
+
+def task_progression(config: TranscriptionConfig) -> TaskProgression:
+    return TaskProgression(
+        [
+            ("preprocessing", True),
+            ("transcription", True),
+            ("diarization", config.diarizationConfig.isEnabled),
+            ("punctuation", config.punctuationConfig.isEnabled),
+            ("postprocessing", True),
+        ]
+    )
+
+
+class TaskTestCase(unittest.TestCase):
+    """Runs the tasks eagerly in a temporary audio folder with a mocked database"""
+
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.file_name = os.path.join(self.folder.name, "audio.wav")
+        wavio.write(self.file_name, np.random.default_rng(0).integers(-1000, 1000, 16000 * 20, dtype=np.int16), 16000)
+        self.db_client = mock.Mock()
+        self.db_client.fetch_chunk_transcriptions.return_value = {}
+        self.db_client.push_result.return_value = "result_id"
+        for patcher in [
+            mock.patch.object(transcription_task, "db_client", self.db_client),
+            mock.patch.object(transcription_task, "_setup_logging"),
+            mock.patch.object(transcription_task.celery.Task, "update_state"),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def subfiles(self, *chunks) -> list:
+        """Writes the subfiles of (offset, duration) chunks"""
+        subfiles = []
+        for i, (offset, duration) in enumerate(chunks):
+            subfile_path = os.path.join(self.folder.name, f"audio_{i}.wav")
+            wavio.write(subfile_path, np.zeros(int(duration * 16000), dtype=np.int16), 16000)
+            subfiles.append((subfile_path, offset, duration))
+        return subfiles
+
+    def task_info(self, timestamps=None) -> dict:
+        return {
+            "service_name": "stt",
+            "hash": "hash",
+            "pcm_hash": "pcm_hash",
+            "keep_audio": True,
+            "timestamps": timestamps,
+        }
+
+    def config(self, diarization: bool = False) -> TranscriptionConfig:
+        config = TranscriptionConfig({"diarizationConfig": {"enableDiarization": diarization}})
+        if diarization:
+            config.diarizationConfig.setService("diarization", "diarization_queue")
+        return config
+
+
+class TestEventWorkflow(TaskTestCase):
+
+    def test_chord(self):
+        subfiles = self.subfiles((0.0, 12.0), (12.0, 8.0))
+        config = self.config(diarization=True)
+        workflow = _event_workflow(self.task_info(), config, task_progression(config), self.file_name, subfiles)
+
+        self.assertIsInstance(workflow, _chord)
+        header = list(workflow.tasks)
+        self.assertEqual([task.task for task in header], ["transcribe_task", "transcribe_task", "diarization_task"])
+        self.assertEqual([task.args[0] for task in header[:2]], [subfile_path for subfile_path, _, _ in subfiles])
+        self.assertEqual([task.options["queue"] for task in header], ["stt", "stt", "diarization_queue"])
+        # The diarization result is the last element of the chord results
+        self.assertEqual(list(header[-1].args), [self.file_name, None, None])
+
+        body = workflow.body
+        self.assertEqual(body.task, "transcription_merge_task")
+        self.assertEqual(body.options["queue"], "stt_requests")
+        context = body.args[0]
+        self.assertEqual(context["subfiles"], subfiles)
+        self.assertTrue(context["diarization"])
+        # Chunks are saved in the chunk cache as they complete
+        callbacks = [task.options["link"] for task in header[:2]]
+        self.assertEqual(
+            [[callback["task"] for callback in links] for links in callbacks],
+            [["transcription_chunk_cache_task"]] * 2,
+        )
+        self.assertEqual([links[0]["options"]["queue"] for links in callbacks], ["stt_requests"] * 2)
+        self.assertNotIn("link", header[-1].options)
+        self.assertEqual(
+            TaskProgression.fromDict(context["progress"]).steps["diarization"].state, StepState.STARTED
+        )
+
+        # Subfiles are removed if a subtask fails: the chord errback is called when the body fails
+        (errback,) = workflow.body.options["link_error"]
+        self.assertEqual(errback["task"], "transcription_cleanup_task")
+        self.assertEqual(
+            errback["kwargs"]["file_paths"], [subfile_path for subfile_path, _, _ in subfiles]
+        )
+
+    def test_cached_chunks(self):
+        subfiles = self.subfiles((0.0, 12.0), (12.0, 8.0))
+        config = self.config()
+        with mock.patch.object(transcription_task, "pcmChunkFingerprint", side_effect=["h0", "h1"]):
+            self.db_client.fetch_chunk_transcriptions.return_value = {"h0": chunk_transcription(("a", 0, 1))}
+            workflow = _event_workflow(self.task_info(), config, task_progression(config), self.file_name, subfiles)
+
+        self.assertEqual([task.args[0] for task in workflow.tasks], [subfiles[1][0]])
+        context = workflow.body.args[0]
+        self.assertEqual(context["subfiles"], subfiles[1:])
+        (callback,) = workflow.tasks[0].options["link"]
+        self.assertEqual(list(callback["args"]), ["h1"])
+        self.assertEqual(context["chunk_indexes"], [1])
+        self.assertEqual(context["cached_transcriptions"], [(chunk_transcription(("a", 0, 1)), 0.0, 0)])
+        self.assertFalse(os.path.exists(subfiles[0][0]))
+
+    def test_diarization_only(self):
+        # Transcription available: no subfile to clean up
+        config = self.config(diarization=True)
+        workflow = _event_workflow(self.task_info(), config, task_progression(config), self.file_name, None)
+
+        self.assertIsInstance(workflow, _chord)
+        self.assertEqual([task.task for task in workflow.tasks], ["diarization_task"])
+        self.assertNotIn("link_error", workflow.body.options)
+
+    def test_empty_header(self):
+        # Transcription available and no diarization: the merge task runs directly
+        config = self.config()
+        workflow = _event_workflow(self.task_info(), config, task_progression(config), self.file_name, None)
+
+        self.assertIsInstance(workflow, Signature)
+        self.assertEqual(workflow.task, "transcription_merge_task")
+        results, context = workflow.args
+        self.assertEqual(results, [])
+        self.assertIsNone(context["subfiles"])
+        self.assertNotIn("link_error", workflow.options)
+
+        self.db_client.fetch_transcription.return_value = chunk_transcription(("a", 0, 1), ("b", 1, 2))
+        self.assertEqual(transcription_merge_task.apply(args=workflow.args).get(), "result_id")
+        self.db_client.fetch_transcription.assert_called_once_with("hash", "pcm_hash")
+        result = self.db_client.push_result.call_args.kwargs["result"]
+        self.assertEqual(result.raw_transcription, "a b")
+
+
+class TestMergeTask(TaskTestCase):
+
+    def test_merge_with_diarization(self):
+        subfiles = self.subfiles((0.0, 12.0), (12.0, 8.0))
+        config = self.config(diarization=True)
+        workflow = _event_workflow(self.task_info(), config, task_progression(config), self.file_name, subfiles)
+        speakers = {
+            "segments": [
+                {"seg_begin": 0.0, "seg_end": 12.5, "spk_id": "spk1", "seg_id": 1},
+                {"seg_begin": 12.5, "seg_end": 20.0, "spk_id": "spk2", "seg_id": 2},
+            ]
+        }
+        results = [chunk_transcription(("a", 1, 2), ("b", 10, 11)), chunk_transcription(("c", 1, 2)), speakers]
+
+        self.assertEqual(transcription_merge_task.apply(args=(results, *workflow.body.args)).get(), "result_id")
+
+        result = self.db_client.push_result.call_args.kwargs["result"]
+        self.assertEqual([(seg.speaker_id, seg.toString()) for seg in result.segments], [("spk1", "a b"), ("spk2", "c")])
+        self.assertEqual([w.start for w in result.words], [1, 10, 13])
+        self.db_client.push_transcription.assert_called_once()
+        self.assertFalse(any(os.path.exists(subfile_path) for subfile_path, _, _ in subfiles))
+
+
+class TestBlockingTask(TaskTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.db_client.fetch_cached_result_id.return_value = None
+        self.db_client.fetch_transcription.return_value = None
+        # Chunk cache
+        self.chunks = {}
+        self.db_client.push_chunk_transcriptions.side_effect = lambda chunks, ttl: self.chunks.update(chunks)
+        self.db_client.fetch_chunk_transcriptions.side_effect = lambda hashes: {
+            chunk_hash: self.chunks[chunk_hash] for chunk_hash in hashes if chunk_hash in self.chunks
+        }
+        self.dispatched = []
+        self.failing_chunk = None
+        self.completion_order = None  # Job indexes in completion order, dispatch order if not set
+        for patcher in [
+            mock.patch.object(transcription_task, "ServiceResolver"),
+            mock.patch.object(transcription_task, "ResultSet", self.result_set),
+            mock.patch.object(transcription_task.celery, "send_task", side_effect=self.send_task),
+        ]:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def send_task(self, name: str, queue: str, args: list, kwargs: dict) -> FakeJob:
+        """transcribe_task transcribing each chunk as its subfile name"""
+        chunk = os.path.splitext(os.path.basename(args[0]))[0]
+        self.dispatched.append(chunk)
+        if chunk == self.failing_chunk:
+            return FakeJob(chunk, error=Exception("STT failure"))
+        return FakeJob(chunk, chunk_transcription((chunk, 1, 2)))
+
+    def result_set(self, jobs: list) -> FakeResultSet:
+        if self.completion_order is None:
+            return FakeResultSet(jobs)
+        return FakeResultSet([jobs[i] for i in self.completion_order])
+
+    def transcribe(self, data: np.ndarray, timestamps: list = None) -> str:
+        file_path = os.path.join(self.folder.name, "audio.wav")
+        wavio.write(file_path, data, 16000)
+        task_info = self.task_info(timestamps)
+        task_info["transcription_config"] = {"vadConfig": {"enableVAD": False, "windowDuration": 10, "windowOverlap": 0}}
+        return transcription_task.transcription_task.apply(args=(task_info, file_path)).get()
+
+    def test_resubmit_after_chunk_failure(self):
+        data = np.random.default_rng(1).integers(-1000, 1000, 16000 * 30, dtype=np.int16)
+        # The second chunk fails, the third one completed meanwhile
+        self.failing_chunk = "_audio_1"
+        with self.assertRaises(Exception):
+            self.transcribe(data)
+        self.assertEqual(self.dispatched, ["_audio_0", "_audio_1", "_audio_2"])
+        self.assertEqual(
+            sorted(transcription["words"][0]["word"] for transcription in self.chunks.values()),
+            ["_audio_0", "_audio_2"],
+        )
+
+        # Only the failed chunk is transcribed again
+        self.dispatched, self.failing_chunk = [], None
+        self.assertEqual(self.transcribe(data), "result_id")
+        self.assertEqual(self.dispatched, ["_audio_1"])
+        result = self.db_client.push_result.call_args.kwargs["result"]
+        self.assertEqual(result.raw_transcription, "_audio_0 _audio_1 _audio_2")
+        self.assertEqual([w.start for w in result.words], [1, 11, 21])
+        self.assertEqual(len(self.chunks), 3)
+
+    def test_timestamps_completion_order(self):
+        # Overlapping speaker turns starting at the same time
+        timestamps = [
+            {"start": 0.0, "end": 5.0, "spk_id": "spk1"},
+            {"start": 0.0, "end": 5.0, "spk_id": "spk2"},
+            {"start": 5.0, "end": 10.0, "spk_id": "spk1"},
+        ]
+        data = np.random.default_rng(2).integers(-1000, 1000, 16000 * 10, dtype=np.int16)
+        # The first turns have the same samples: disable the chunk cache to transcribe both
+        with mock.patch.object(transcription_task, "CHUNK_CACHE_TTL", 0):
+            for completion_order in [[0, 1, 2], [2, 1, 0], [1, 0, 2]]:
+                self.completion_order = completion_order
+                self.assertEqual(self.transcribe(data, timestamps), "result_id")
+                result = self.db_client.push_result.call_args.kwargs["result"]
+                self.assertEqual(
+                    [(seg.speaker_id, seg.raw_segment) for seg in result.segments],
+                    [("spk1", "_audio_0"), ("spk2", "_audio_1"), ("spk1", "_audio_2")],
+                )
+
+    def test_timestamps_transcription_key(self):
+        data = np.random.default_rng(4).integers(-1000, 1000, 16000 * 10, dtype=np.int16)
+        timestamps = [{"start": 0.0, "end": 5.0, "spk_id": "spk1"}]
+        self.transcribe(data, timestamps)
+        (_, _, timestamps_pcm_hash), _ = self.db_client.push_transcription.call_args
+        # The transcription of the timestamps is not looked up for the whole audio
+        self.transcribe(data)
+        (_, pcm_hash), _ = self.db_client.fetch_transcription.call_args
+        self.assertNotEqual(pcm_hash, timestamps_pcm_hash)
+        (_, _, pushed_pcm_hash), _ = self.db_client.push_transcription.call_args
+        self.assertEqual(pushed_pcm_hash, pcm_hash)
+
+    def test_result_cache_hit(self):
+        data = np.random.default_rng(3).integers(-1000, 1000, 16000 * 30, dtype=np.int16)
+        self.db_client.fetch_cached_result_id.return_value = "cached_result_id"
+        self.assertEqual(self.transcribe(data), "cached_result_id")
+        # Nothing is transcribed nor saved
+        self.assertEqual(self.dispatched, [])
+        self.db_client.fetch_transcription.assert_not_called()
+        self.db_client.push_result.assert_not_called()
+        self.db_client.push_cached_result_id.assert_not_called()
+
+    def test_result_cache_miss(self):
+        data = np.random.default_rng(3).integers(-1000, 1000, 16000 * 30, dtype=np.int16)
+        self.assertEqual(self.transcribe(data), "result_id")
+        self.assertEqual(self.dispatched, ["_audio_0", "_audio_1", "_audio_2"])
+        (result_key,) = self.db_client.fetch_cached_result_id.call_args.args
+        self.db_client.push_cached_result_id.assert_called_once_with(
+            result_key, "result_id", transcription_task.RESULT_CACHE_TTL
+        )
+
+    def test_result_cache_evicted(self):
+        data = np.random.default_rng(3).integers(-1000, 1000, 16000 * 30, dtype=np.int16)
+        # The cached result was removed from the results collection
+        client = DBClient({"db_host": "localhost", "db_port": 27017, "service_name": "stt", "db_name": "test"})
+        client.result_cache_collection = mock.Mock()
+        client.result_cache_collection.find_one.return_value = {"_id": "result_key", "result_id": "removed_id"}
+        client.results_collection = mock.Mock()
+        client.results_collection.count_documents.return_value = 0
+        self.db_client.fetch_cached_result_id.side_effect = client.fetch_cached_result_id
+
+        self.assertEqual(self.transcribe(data), "result_id")
+        self.assertEqual(self.dispatched, ["_audio_0", "_audio_1", "_audio_2"])
+        (result_key,) = self.db_client.fetch_cached_result_id.call_args.args
+        client.result_cache_collection.delete_one.assert_called_once_with({"_id": result_key})
+        self.db_client.push_cached_result_id.assert_called_once_with(
+            result_key, "result_id", transcription_task.RESULT_CACHE_TTL
+        )
+
+    def test_result_cache_disabled(self):
+        data = np.random.default_rng(3).integers(-1000, 1000, 16000 * 30, dtype=np.int16)
+        with mock.patch.object(transcription_task, "RESULT_CACHE_TTL", 0):
+            self.assertEqual(self.transcribe(data), "result_id")
+        self.db_client.fetch_cached_result_id.assert_not_called()
+        self.db_client.push_cached_result_id.assert_not_called()
+
+    def test_timestamps_chunk_planning(self):
+        # Speaker turns starting at the same time with different durations
+        timestamps = [
+            {"start": 0.0, "end": 3.0, "spk_id": "spk1"},
+            {"start": 0.0, "end": 5.0, "spk_id": "spk2"},
+        ]
+        data = np.random.default_rng(5).integers(-1000, 1000, 16000 * 5, dtype=np.int16)
+        with mock.patch.object(transcription_task, "CHUNK_PLANNING", True), mock.patch.object(
+            transcription_task, "STT_CONCURRENCY", 2
+        ):
+            self.assertEqual(self.transcribe(data, timestamps), "result_id")
+        self.assertEqual(self.dispatched, ["_audio_0", "_audio_1"])
+        result = self.db_client.push_result.call_args.kwargs["result"]
+        self.assertEqual(
+            [(seg.speaker_id, seg.raw_segment) for seg in result.segments],
+            [("spk1", "_audio_0"), ("spk2", "_audio_1")],
+        )
+
+    def test_iter_batches(self):
+        self.assertEqual(list(_iter_batches(range(10), 4)), [[0], [1, 2], [3, 4, 5, 6], [7, 8, 9]])
+        self.assertEqual(list(_iter_batches(range(3), 1)), [[0], [1], [2]])
+        self.assertEqual(list(_iter_batches([], 4)), [])
+
+
+class TestTranscriptionKey(unittest.TestCase):
+
+    def test_pcm_hash(self):
+        data = np.arange(-8000, 8000, dtype=np.int16)
+        with tempfile.TemporaryDirectory() as folder:
+            file_paths = [os.path.join(folder, "audio.wav"), os.path.join(folder, "tagged.wav")]
+            wavio.write(file_paths[0], data, 16000)
+            # Same samples with a metadata chunk between fmt and data
+            with open(file_paths[0], "rb") as f:
+                content = f.read()
+            with open(file_paths[1], "wb") as f:
+                f.write(content[:36] + b"LIST" + (10).to_bytes(4, "little") + b"INFOtitle!" + content[36:])
+            config = TranscriptionConfig()
+            self.assertEqual(_pcm_hash(file_paths[0], config), _pcm_hash(file_paths[1], config))
+            # Transcriptions of other chunks of the same audio are not reused
+            vad_configs = [
+                {"enableVAD": False},
+                {"methodName": "Energy"},
+                {"minDuration": 30.0},
+                {"enableVAD": False, "windowDuration": 30.0},
+            ]
+            keys = {_pcm_hash(file_paths[0], TranscriptionConfig({"vadConfig": vad_config})) for vad_config in vad_configs}
+            self.assertEqual(len(keys | {_pcm_hash(file_paths[0], config)}), len(vad_configs) + 1)
+            # Nor transcriptions of timestamps
+            timestamps = [{"start": 0.0, "end": 0.5, "spk_id": "spk1"}]
+            self.assertNotEqual(_pcm_hash(file_paths[0], config, timestamps), _pcm_hash(file_paths[0], config))
+
+
+    def test_result_key(self):
+        def result_key(config: dict, diarization_service: str = None, timestamps: list = None, file_hash: str = "hash"):
+            config = TranscriptionConfig(config)
+            if diarization_service is not None:
+                config.diarizationConfig.setService(diarization_service, f"{diarization_service}_queue")
+            task_info = {"hash": file_hash, "service_name": "stt", "timestamps": timestamps}
+            return _result_key(task_info, config)
+
+        config = {
+            "vadConfig": {"enableVAD": True, "methodName": "WebRTC"},
+            "diarizationConfig": {"enableDiarization": True, "serviceName": None},
+        }
+        reordered = {
+            "diarizationConfig": {"serviceName": None, "enableDiarization": True},
+            "vadConfig": {"methodName": "WebRTC", "enableVAD": True},
+        }
+        key = result_key(config, "diarization-1")
+        # Key order and default values do not matter
+        self.assertEqual(result_key(reordered, "diarization-1"), key)
+        self.assertEqual(
+            result_key({"diarizationConfig": {"enableDiarization": True}}, "diarization-1"), key
+        )
+        # Requests resolved to another service, with other timestamps or audio do not share their result
+        timestamps = [{"start": 0.0, "end": 5.0, "spk_id": "spk1"}]
+        keys = {
+            key,
+            result_key(config, "diarization-2"),
+            result_key(config, "diarization-1", timestamps),
+            result_key(config, "diarization-1", file_hash="other"),
+        }
+        self.assertEqual(len(keys), 4)
+
+
+class TestChunkCacheTask(TaskTestCase):
+
+    def test_chunk_cache(self):
+        transcription = chunk_transcription(("a", 0, 1))
+        transcription_chunk_cache_task.apply(args=(transcription, "h0")).get()
+        self.db_client.push_chunk_transcriptions.assert_called_once_with(
+            {"h0": transcription}, transcription_task.CHUNK_CACHE_TTL
+        )
+
+
+class TestCleanupTask(unittest.TestCase):
+
+    def test_cleanup(self):
+        with tempfile.TemporaryDirectory() as folder:
+            file_paths = [os.path.join(folder, f"audio_{i}.wav") for i in range(3)]
+            for file_path in file_paths[:2]:
+                open(file_path, "w").close()
+            # Errbacks are called with the failed task request, exception and traceback
+            transcription_cleanup_task.apply(args=(None, Exception("failed"), None), kwargs={"file_paths": file_paths}).get()
+            self.assertEqual(os.listdir(folder), [])
+
+
+class TestTaskProgression(unittest.TestCase):
+
+    def test_dict_round_trip(self):
+        progress = TaskProgression([("preprocessing", True), ("transcription", True), ("diarization", False)])
+        progress.steps["preprocessing"].state = StepState.DONE
+        progress.steps["transcription"].state = StepState.STARTED
+        progress.steps["transcription"].progress = 0.25
+        restored = TaskProgression.fromDict(progress.toDict())
+        self.assertEqual(restored.toDict(), progress.toDict())
+        self.assertEqual(restored.steps["transcription"].state, StepState.STARTED)
+        self.assertFalse(restored.steps["diarization"].required)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -25,6 +25,10 @@ celery.conf.update(
     {
         "task_routes": {
             "transcription_task": {"queue": "{}_requests".format(service_name)},
+            "transcription_merge_task": {"queue": "{}_requests".format(service_name)},
+            "transcription_finalize_task": {"queue": "{}_requests".format(service_name)},
+            "transcription_cleanup_task": {"queue": "{}_requests".format(service_name)},
+            "transcription_chunk_cache_task": {"queue": "{}_requests".format(service_name)},
             # Not Implemented
             # "transcription_task_multi": {"queue": "{}_requests".format(service_name)},
         }
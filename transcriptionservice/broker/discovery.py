@@ -1,14 +1,26 @@
 """ The discovery submodule contains methods and function to list and fetch informations relative to subtasks."""
 import json
 import os
+import time
+from typing import Dict, List
 
 import redis
 from redis.commands.search.field import NumericField, TextField
 from redis.commands.search.indexDefinition import IndexDefinition, IndexType
+from redis.commands.search.query import Query
 
+from transcriptionservice import logger
 from transcriptionservice.broker.celeryapp import celery
 
-__all__ = ["Service", "list_available_services", "SERVICE_TYPES"]
+__all__ = [
+    "Service",
+    "ServiceRegistry",
+    "list_available_services",
+    "queue_concurrency",
+    "queue_lengths",
+    "service_registry",
+    "SERVICE_TYPES",
+]
 
 SERVICE_DISCOVERY_DB = 0  # RedisJSON only allow json indexing on DB 0
 SERVICE_TYPES = [
@@ -16,37 +28,41 @@ SERVICE_TYPES = [
     "punctuation",
 ]  # If you intend to add other subservice, add their service's type here
 LANGUAGE = os.environ.get("LANGUAGE")
+SEARCH_PAGE_SIZE = 1000  # Number of registry documents fetched per search request
+# If set, a service is alive if its last heartbeat (last_alive) is less than HEARTBEAT_WINDOW seconds old.
+# Otherwise, running workers are listed using celery inspect.
+HEARTBEAT_WINDOW = float(os.environ.get("SERVICE_HEARTBEAT_WINDOW", 0))
+# Keys of the service list shared by ServiceRegistry (outside of the "service:" index prefix)
+SNAPSHOT_KEY = "services_snapshot"
+SNAPSHOT_LOCK_KEY = "services_snapshot_lock"
+
+_connection_pool = None
 
 
 def list_available_services(ensure_alive: bool = False, as_json: bool = False) -> dict:
     """Fetch available services, filter by language and sort by type
 
     Args:
-        ensure_alive (bool, optional): If true, check if the registered service still exist. Defaults to False.
+        ensure_alive (bool, optional): If true, check if the registered service still exist and remove dead
+            services from the registry. Defaults to False.
 
     Returns:
         dict: A dictionary containing types as primary key. Each type containing available service informations.
     """
-    services = dict()
+    services = {service_type: {} for service_type in SERVICE_TYPES}
 
     # Connect to the service registry DB
-    host, port = os.environ.get("SERVICES_BROKER").split("//")[1].split(":")
-    redis_client = redis.Redis(
-        host=host,
-        port=int(port),
-        db=SERVICE_DISCOVERY_DB,
-        password=os.environ.get("BROKER_PASS", "password"),
-    )
+    redis_client = _registry_client()
 
-    if ensure_alive:
+    if ensure_alive and not HEARTBEAT_WINDOW:
         worker_names = set(k.split("@")[1] for k in celery.control.inspect().active_queues().keys())
 
     # Handle indexdrop
     # Tries to restore the service index if it has been dropped.
     try:
-        service_l_doc = redis_client.ft().search("*").docs
+        service_l_doc = _search_all(redis_client)
     except Exception as error:
-        print("Service index has been dropped. Attempting to restore ...")
+        logger.warning("Service index has been dropped. Attempting to restore ...")
         schema = (
             TextField("$.service_name", as_name="service_name"),
             TextField("$.service_type", as_name="service_type"),
@@ -62,43 +78,156 @@ def list_available_services(ensure_alive: bool = False, as_json: bool = False) -
                 schema,
                 definition=IndexDefinition(prefix=["service:"], index_type=IndexType.JSON),
             )
-            service_l_doc = redis_client.ft().search("*").docs
+            service_l_doc = _search_all(redis_client)
         except Exception:
             raise Exception("Service Index has been drop and restore attempt failed.")
-        print("Index successfully restored")
+        logger.info("Index successfully restored")
 
     # Listing services
-    for service_type in SERVICE_TYPES:
-        services[service_type] = {}
-        service_l_doc = redis_client.ft().search(service_type).docs
-        # Filter and check services
-        for service_doc in service_l_doc:
-            service_id = service_doc.id
-            service_info = json.loads(service_doc.json)
-            print(service_info)
-            # Ensure service type
-            if service_info["service_type"] != service_type:
+    now = time.time()
+    stale_ids = []
+    for service_doc in service_l_doc:
+        service_id = service_doc.id
+        service_info = json.loads(service_doc.json)
+        logger.debug(service_info)
+        # Ensure service type
+        service_type = service_info["service_type"]
+        if service_type not in services:
+            continue
+        # Check if the service is up
+        if ensure_alive:
+            if HEARTBEAT_WINDOW:
+                is_alive = now - float(service_info["last_alive"]) <= HEARTBEAT_WINDOW
+            else:
+                is_alive = service_id.split(":")[1] in worker_names
+            if not is_alive:
+                stale_ids.append(service_id)
                 continue
-            # Filter by language
-            if _is_compatible_language(LANGUAGE, service_info["service_language"]):
-                # Check if the service is up
-                if ensure_alive:
-                    if not service_id.split(":")[1] in worker_names:
-                        redis_client.ft().delete_document(service_id)
-                        print(
-                            f"Service host {service_id} is registered but do not exist. Removing entry from registry."
-                        )
-                if service_info["service_name"] in services.keys():
-                    services[service_type][service_info["service_name"]].add_instance(
-                        service_info, service_id
-                    )
-                else:
-                    services[service_type][
-                        service_info["service_name"]
-                    ] = Service.from_service_info(service_info, service_id)
+        # Filter by language
+        if _is_compatible_language(LANGUAGE, service_info["service_language"]):
+            if service_info["service_name"] in services[service_type]:
+                services[service_type][service_info["service_name"]].add_instance(
+                    service_info, service_id
+                )
+            else:
+                services[service_type][
+                    service_info["service_name"]
+                ] = Service.from_service_info(service_info, service_id)
+
+    # Remove dead services from the registry
+    if stale_ids:
+        logger.warning(
+            f"Service hosts {stale_ids} are registered but do not exist. Removing entries from registry."
+        )
+        redis_client.delete(*stale_ids)
     return prettyfy(services) if as_json else services
 
 
+class ServiceRegistry:
+    """Cache of the available services (ensure_alive=True) shared by every process through the registry DB.
+
+    The service list is stored under SNAPSHOT_KEY and expires after ttl seconds. Once it has expired, the first
+    process accessing it takes SNAPSHOT_LOCK_KEY and fetches the list again, the others keep using their last
+    copy meanwhile. No process polls the registry while idle. A ttl of 0 disables the cache.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._services = None  # Last snapshot read by this process
+
+    def get(self, as_json: bool = False) -> dict:
+        """Returns available services as list_available_services(ensure_alive=True) would.
+
+        Args:
+            as_json (bool, optional): If true, returns a serializable dictionary. Defaults to False.
+        """
+        if self.ttl <= 0:
+            return list_available_services(ensure_alive=True, as_json=as_json)
+        redis_client = _registry_client()
+        snapshot = redis_client.get(SNAPSHOT_KEY)
+        if snapshot is not None:
+            self._services = _services_from_json(json.loads(snapshot))
+        elif redis_client.set(SNAPSHOT_LOCK_KEY, os.getpid(), nx=True, px=int(self.ttl * 1000)):
+            self.refresh()
+        elif self._services is None:
+            # Another process is refreshing the snapshot: skip the liveness check
+            self._services = list_available_services()
+        return prettyfy(self._services) if as_json else self._services
+
+    def refresh(self) -> dict:
+        """Fetch the service list now, stores it in the snapshot and returns it"""
+        services = list_available_services(ensure_alive=True)
+        _registry_client().set(SNAPSHOT_KEY, json.dumps(prettyfy(services)), px=int(self.ttl * 1000))
+        self._services = services
+        return services
+
+
+service_registry = ServiceRegistry(float(os.environ.get("SERVICE_REGISTRY_TTL", 30)))
+
+
+def queue_concurrency(queue_name: str) -> int:
+    """Returns the total concurrency of the live registered instances consuming queue_name, whatever their type
+
+    Args:
+        queue_name (str): Celery queue name
+    """
+    now = time.time()
+    return sum(
+        int(service_info["concurrency"])
+        for service_info in (json.loads(doc.json) for doc in _search_all(_registry_client()))
+        if service_info.get("queue_name") == queue_name
+        and (not HEARTBEAT_WINDOW or now - float(service_info["last_alive"]) <= HEARTBEAT_WINDOW)
+    )
+
+
+def queue_lengths(queue_names: List[str]) -> Dict[str, int]:
+    """Fetch the number of pending tasks in each of the given broker queues
+
+    Args:
+        queue_names (List[str]): Celery queue names
+
+    Returns:
+        Dict[str, int]: Number of messages waiting in each queue
+    """
+    # Celery broker and service registry share the same redis database
+    pipeline = _registry_client().pipeline(transaction=False)
+    for queue_name in queue_names:
+        pipeline.llen(queue_name)
+    return dict(zip(queue_names, pipeline.execute()))
+
+
+def _registry_client() -> redis.Redis:
+    """Returns a client using the module connection pool"""
+    global _connection_pool
+    if _connection_pool is None:
+        host, port = os.environ.get("SERVICES_BROKER").split("//")[1].split(":")
+        _connection_pool = redis.ConnectionPool(
+            host=host,
+            port=int(port),
+            db=SERVICE_DISCOVERY_DB,
+            password=os.environ.get("BROKER_PASS", "password"),
+        )
+    return redis.Redis(connection_pool=_connection_pool)
+
+
+def _search_all(redis_client: redis.Redis) -> list:
+    """Fetch every document of the service index, SEARCH_PAGE_SIZE documents per request"""
+    docs = []
+    while True:
+        result = redis_client.ft().search(Query("*").paging(len(docs), SEARCH_PAGE_SIZE))
+        docs.extend(result.docs)
+        if not result.docs or len(docs) >= result.total:
+            return docs
+
+
+def _services_from_json(pretty_dict: dict) -> dict:
+    """Returns the services dictionary of a list presented by prettyfy()"""
+    return {
+        service_type: {service["service_name"]: Service.from_dict(service) for service in services}
+        for service_type, services in pretty_dict.items()
+    }
+
+
 def prettyfy(services_dict: dict) -> dict:
     """Present the service list to be returned to the consumer
 
@@ -167,6 +296,11 @@ class Service:
         }
         self.instances.append(instance_info)
 
+    @property
+    def concurrency(self) -> int:
+        """Total number of tasks the service instances can process at once"""
+        return sum(int(instance["concurrency"]) for instance in self.instances)
+
     @classmethod
     def from_service_info(cls, service_info: dict, service_id: str) -> "Service":
         service = Service(
@@ -179,6 +313,18 @@ class Service:
         service.add_instance(service_info, service_id)
         return service
 
+    @classmethod
+    def from_dict(cls, service_dict: dict) -> "Service":
+        service = Service(
+            service_dict["service_name"],
+            service_dict["service_type"],
+            service_dict["service_language"],
+            service_dict["queue_name"],
+            service_dict["info"],
+        )
+        service.instances = list(service_dict["instances"])
+        return service
+
     def to_dict(self) -> dict:
         return {
             "service_name": self.service_name,
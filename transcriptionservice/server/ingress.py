@@ -11,14 +11,17 @@ from celery.signals import after_task_publish
 from flask import Flask, json, request
 
 from transcriptionservice import logger
-from transcriptionservice.broker.discovery import list_available_services
+from transcriptionservice.broker.discovery import service_registry
 from transcriptionservice.server.confparser import createParser
 from transcriptionservice.server.formating import formatResult
 from transcriptionservice.server.mongodb.db_client import DBClient
 from transcriptionservice.server.serving import GunicornServing
 from transcriptionservice.server.swagger import setupSwaggerUI
 from transcriptionservice.server.utils import fileHash, read_timestamps, requestlog
-from transcriptionservice.server.utils.ressources import write_ressource
+from transcriptionservice.server.utils.ressources import (
+    RessourceUploadRequest,
+    rename_ressource,
+)
 from transcriptionservice.transcription.configs.transcriptionconfig import (
     TranscriptionConfig,
     TranscriptionConfigMulti,
@@ -31,7 +34,15 @@ from transcriptionservice.transcription.transcription_task import (
 AUDIO_FOLDER = "/opt/audio"
 SUPPORTED_HEADER_FORMAT = ["text/plain", "application/json", "text/vtt", "text/srt"]
 
+
+class UploadRequest(RessourceUploadRequest):
+    """Uploaded files are written in AUDIO_FOLDER as they are received"""
+
+    ressource_folder = AUDIO_FOLDER
+
+
 app = Flask("__services_manager__")
+app.request_class = UploadRequest
 app.config["JSON_AS_ASCII"] = False
 app.config["JSON_SORT_KEYS"] = False
 
@@ -44,7 +55,7 @@ def healthcheck():
 
 @app.route("/list-services", methods=["GET"])
 def list_subservices():
-    return list_available_services(as_json=True, ensure_alive=True), 200
+    return service_registry.get(as_json=True), 200
 
 
 @app.route("/job/<jobid>", methods=["GET"])
@@ -58,10 +69,18 @@ def jobstatus(jobid):
     if state == "SENT": # See below
         return json.dumps({"state": "pending"}), 202
     elif state == task_states.STARTED:
-        return (
-            json.dumps({"state": "started", "steps": task.info.get("steps", {})}),
-            202,
-        )
+        status = {"state": "started", "steps": task.info.get("steps", {})}
+        if request.args.get("partial", "").lower() in ["1", "true"]:
+            try:
+                partial_transcription = db_client.fetch_partial_transcription(jobid)
+            except Exception as error:
+                logger.warning(f"Failed to fetch partial transcription: {error}")
+                partial_transcription = None
+            if partial_transcription is not None:
+                status["partial_transcription"] = " ".join(
+                    [w["word"] for w in partial_transcription["words"]]
+                ).strip()
+        return json.dumps(status), 202
     elif state == task_states.SUCCESS:
         result_id = task.get()
         return json.dumps({"state": "done", "result_id": result_id}), 201
@@ -149,15 +168,26 @@ def transcription_multi():
             400,
         )
 
+    # Parse transcription config
+    try:
+        transcription_config = TranscriptionConfigMulti(
+            request.form.get("transcriptionConfig", {})
+        )
+        logger.debug(transcription_config)
+    except Exception:
+        logger.debug(request.form.get("transcriptionConfig", {}))
+        return "Failed to interpret transcription config", 400
+
     # Files
     random_hash = fileHash(os.urandom(32))
     audios = []
     for audio_file in files:
-        file_buffer = audio_file.read()
-        file_hash = fileHash(file_buffer)
         file_ext = audio_file.filename.split(".")[-1]
         try:
-            file_path = write_ressource(file_buffer, f"{file_hash}_{random_hash}", AUDIO_FOLDER, file_ext)
+            file_hash = audio_file.stream.hexdigest()
+            file_path = rename_ressource(
+                audio_file.stream.file_path, f"{file_hash}_{random_hash}", file_ext
+            )
         except Exception as e:
             logger.error("Failed to write ressource: {}".format(e))
             return "Server Error: Failed to write ressource", 500
@@ -168,15 +198,6 @@ def transcription_multi():
                 "file_path": file_path,
             }
         )
-    # Parse transcription config
-    try:
-        transcription_config = TranscriptionConfigMulti(
-            request.form.get("transcriptionConfig", {})
-        )
-        logger.debug(transcription_config)
-    except Exception:
-        logger.debug(request.form.get("transcriptionConfig", {}))
-        return "Failed to interpret transcription config", 400
 
     # Task info
     task_info = {
@@ -211,9 +232,7 @@ def transcription():
     # Files
     ## Audio file
     file_key = list(request.files.keys())[0]
-    file_buffer = request.files[file_key].read()
     extension = request.files[file_key].filename.split(".")[-1]
-    file_hash = fileHash(file_buffer)
 
     # Timestamps file
     if "timestamps" in request.files.keys():
@@ -247,16 +266,20 @@ def transcription():
         logger.debug(request.form.get("transcriptionConfig", {}))
         return "Failed to interpret transcription config", 400
 
+    # The audio file was written in AUDIO_FOLDER and hashed while the request was received
+    random_hash = fileHash(os.urandom(32))
+    file_path = request.files[file_key].stream.file_path
+    file_hash = request.files[file_key].stream.hexdigest()
+
     # The hash depends on options (of what comes before STT)
     file_hash = f"{file_hash} {timestamps if timestamps is not None else transcription_config.vadConfig.toJson()}".encode("utf8")
     file_hash = fileHash(file_hash)
 
     requestlog(logger, request.remote_addr, transcription_config, file_hash, False)
 
-    # Create ressource
-    random_hash = fileHash(os.urandom(32))
+    # Name ressource after its hash
     try:
-        file_path = write_ressource(file_buffer, f"{file_hash}_{random_hash}", AUDIO_FOLDER, extension)
+        file_path = rename_ressource(file_path, f"{file_hash}_{random_hash}", extension)
     except Exception as e:
         logger.error("Failed to write ressource: {}".format(e))
         return "Server Error: Failed to write ressource", 500
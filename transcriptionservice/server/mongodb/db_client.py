@@ -2,21 +2,29 @@ from datetime import datetime
 from time import time
 from uuid import uuid4
 
-from pymongo import MongoClient, errors
+from pymongo import MongoClient, UpdateOne, errors
 
 from transcriptionservice.transcription.configs.transcriptionconfig import \
     TranscriptionConfig
-from transcriptionservice.transcription.transcription_result import \
-    TranscriptionResult
+from transcriptionservice.transcription.transcription_result import (
+    TranscriptionResult, WordTable)
 
 """ The Databases is structured as follows:
 
-A transcription service uses a database named transcriptiondb in which there are 2 collections:
+A transcription service uses a database named transcriptiondb in which there are 4 collections:
 - A collection named after the SERVICE_NAME to store raw transcription result associated with the associated running linto-stt service.
 Those transcriptions are indexed using the audio file hashcode before transcoding and contain the transcription datetime and words information.
+They also hold a key made of the fingerprint of the transcoded audio and of the timestamps or VAD configuration (pcm_hash) so that the same audio
+in another container can reuse them.
+While a job runs, the words transcribed so far can be checkpointed in the same collection using the job id as id. These partial
+transcriptions are removed once the transcription is complete, and expire after a TTL otherwise.
 - A collection named "results" to store final transcriptions (includes diarization, punctuation data and post-processing). This collection is shared by all running
 transcription services. The final transcription are indexed using a unique result_id and contains in addition to the result itself data related to 
 origin and the configurations used.
+- A collection named after the SERVICE_NAME with a "_chunks" suffix to store the raw transcription of audio chunks, indexed using the
+hash of the chunk samples, so that chunks can be reused across requests. Entries expire after a TTL.
+- A collection named "result_cache" mapping a request key (audio hash, configuration and resolved services) to the result_id of
+the final transcription. Entries expire after a TTL.
 
 """
 
@@ -55,12 +63,20 @@ class DBClient:
         )
         self.transcriptions_collection = self.client[db_info["db_name"]][db_info["service_name"]]
         self.results_collection = self.client[db_info["db_name"]]["results"]
+        self.result_cache_collection = self.client[db_info["db_name"]]["result_cache"]
+        self.chunks_collection = self.client[db_info["db_name"]][f"{db_info['service_name']}_chunks"]
+        self.ttl_indexes = {}
+        self.pcm_hash_indexed = False
         self.isset = True
 
     @mongo_error_handler
-    def fetch_transcription(self, file_hash: str) -> dict:
-        """Fetch transcription result in the SERVICE_NAME collection using file_hash as id"""
-        result = self.transcriptions_collection.find_one({"_id": file_hash})
+    def fetch_transcription(self, file_hash: str, pcm_hash: str = None) -> dict:
+        """Fetch transcription result in the SERVICE_NAME collection using file_hash as id, or pcm_hash if provided"""
+        query = {"_id": file_hash}
+        if pcm_hash is not None:
+            self._ensure_pcm_hash_index()
+            query = {"$or": [query, {"pcm_hash": pcm_hash}]}
+        result = self.transcriptions_collection.find_one(query)
         return result["transcription"] if result is not None else None
 
     @mongo_error_handler
@@ -70,19 +86,122 @@ class DBClient:
         return result["result"] if result is not None else None
 
     @mongo_error_handler
-    def push_transcription(self, file_hash: str, words: list):
-        """Insert transcription result in the SERVICE_NAME collection using file_hash as id"""
+    def fetch_cached_result_id(self, result_key: str) -> str:
+        """Fetch the result_id of a previous request with the same result_key in the result_cache collection.
+        Returns None if there is no such request or if its result no longer exists."""
+        entry = self.result_cache_collection.find_one({"_id": result_key})
+        if entry is None:
+            return None
+        if self.results_collection.count_documents({"_id": entry["result_id"]}, limit=1) == 0:
+            self.result_cache_collection.delete_one({"_id": result_key})
+            return None
+        return entry["result_id"]
+
+    @mongo_error_handler
+    def push_cached_result_id(self, result_key: str, result_id: str, ttl: int):
+        """Insert result_id in the result_cache collection using result_key as id. The entry expires after ttl seconds."""
+        self._ensure_ttl_index(self.result_cache_collection, ttl)
+        self.result_cache_collection.find_one_and_update(
+            {"_id": result_key},
+            {"$set": {"result_id": result_id, "created_at": datetime.utcnow()}},
+            upsert=True,
+        )
+
+    @mongo_error_handler
+    def push_transcription(self, file_hash: str, words: WordTable, pcm_hash: str = None):
+        """Insert transcription result in the SERVICE_NAME collection using file_hash as id.
+        pcm_hash is the key of the transcoded audio and timestamps or VAD configuration, used as a secondary key."""
+        transcription = {
+            "datetime": datetime.fromtimestamp(time()).isoformat(),
+            "transcription": {"words": words.json},
+        }
+        if pcm_hash is not None:
+            self._ensure_pcm_hash_index()
+            transcription["pcm_hash"] = pcm_hash
         self.transcriptions_collection.find_one_and_update(
             {"_id": file_hash},
+            {"$set": transcription},
+            upsert=True,
+        )
+
+    @mongo_error_handler
+    def push_partial_transcription(self, job_id: str, file_hash: str, words: WordTable, progress: float, ttl: int):
+        """Insert the words transcribed so far by job_id in the SERVICE_NAME collection using job_id as id.
+        The entry expires after ttl seconds."""
+        self._ensure_ttl_index(self.transcriptions_collection, ttl)
+        self.transcriptions_collection.find_one_and_update(
+            {"_id": job_id},
             {
                 "$set": {
-                    "datetime": datetime.fromtimestamp(time()).isoformat(),
-                    "transcription": {"words": [w.json for w in words]},
+                    "hash": file_hash,
+                    "partial_transcription": {"words": words.json, "progress": progress},
+                    "created_at": datetime.utcnow(),
                 }
             },
             upsert=True,
         )
 
+    @mongo_error_handler
+    def fetch_partial_transcription(self, job_id: str) -> dict:
+        """Fetch the words transcribed so far by job_id in the SERVICE_NAME collection"""
+        result = self.transcriptions_collection.find_one(
+            {"_id": job_id, "partial_transcription": {"$exists": True}}
+        )
+        return result["partial_transcription"] if result is not None else None
+
+    @mongo_error_handler
+    def delete_partial_transcription(self, job_id: str):
+        self.transcriptions_collection.delete_one(
+            {"_id": job_id, "partial_transcription": {"$exists": True}}
+        )
+
+    @mongo_error_handler
+    def fetch_chunk_transcriptions(self, chunk_hashes: list) -> dict:
+        """Fetch chunk transcriptions in the SERVICE_NAME_chunks collection, returns {chunk_hash: transcription}"""
+        return {
+            entry["_id"]: entry["transcription"]
+            for entry in self.chunks_collection.find({"_id": {"$in": chunk_hashes}})
+        }
+
+    @mongo_error_handler
+    def push_chunk_transcriptions(self, chunk_transcriptions: dict, ttl: int):
+        """Insert {chunk_hash: transcription} in the SERVICE_NAME_chunks collection. Entries expire after ttl seconds."""
+        if not chunk_transcriptions:
+            return
+        self._ensure_ttl_index(self.chunks_collection, ttl)
+        created_at = datetime.utcnow()
+        self.chunks_collection.bulk_write(
+            [
+                UpdateOne(
+                    {"_id": chunk_hash},
+                    {"$set": {"transcription": transcription, "created_at": created_at}},
+                    upsert=True,
+                )
+                for chunk_hash, transcription in chunk_transcriptions.items()
+            ],
+            ordered=False,
+        )
+
+    def _ensure_ttl_index(self, collection, ttl: int):
+        """Expire the collection documents ttl seconds after their created_at field"""
+        if self.ttl_indexes.get(collection.name) == ttl:
+            return
+        try:
+            collection.create_index("created_at", name="created_at_ttl", expireAfterSeconds=ttl)
+        except errors.OperationFailure:
+            # The index exists with another TTL
+            collection.database.command(
+                "collMod",
+                collection.name,
+                index={"name": "created_at_ttl", "expireAfterSeconds": ttl},
+            )
+        self.ttl_indexes[collection.name] = ttl
+
+    def _ensure_pcm_hash_index(self):
+        if not self.pcm_hash_indexed:
+            self.transcriptions_collection.create_index("pcm_hash", sparse=True)
+            self.pcm_hash_indexed = True
+
     @mongo_error_handler
     def push_result(
         self,
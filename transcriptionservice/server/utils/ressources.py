@@ -1,7 +1,18 @@
+import hashlib
 import logging
 import os
+from typing import BinaryIO, Optional
+from uuid import uuid4
 
-__all__ = ["write_ressource", "release_ressource"]
+from flask import Request
+
+__all__ = [
+    "write_ressource",
+    "HashedRessourceFile",
+    "RessourceUploadRequest",
+    "rename_ressource",
+    "release_ressource",
+]
 
 logger = logging.getLogger("__transcription-service__")
 
@@ -18,6 +29,73 @@ def write_ressource(
     return file_path
 
 
+class HashedRessourceFile:
+    """File created in a ressource folder which content is hashed on the fly as it is written.
+
+    Other file operations are delegated to the underlying file.
+    """
+
+    def __init__(self, ressource_folder: str, file_name: str, extension: str):
+        self.file_path = os.path.join(ressource_folder, f"{file_name}.{extension}")
+        logger.debug("Write ressource stream {} at {}".format(file_name, self.file_path))
+        self._file = open(self.file_path, "w+b")
+        self._md5 = hashlib.md5()
+
+    def write(self, data: bytes) -> int:
+        self._md5.update(data)
+        return self._file.write(data)
+
+    def hexdigest(self) -> str:
+        """Returns the md5 hexdigest of the content written so far"""
+        return self._md5.hexdigest()
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+class RessourceUploadRequest(Request):
+    """Flask request writing uploaded files directly in ressource_folder while they are received.
+
+    The uploaded file streams are HashedRessourceFile: files are neither held in memory nor spooled in a
+    temporary file. Files that are not renamed (see rename_ressource) are removed when the request is closed.
+    """
+
+    ressource_folder = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._ressource_files = []
+
+    def _get_file_stream(
+        self,
+        total_content_length: Optional[int],
+        content_type: Optional[str],
+        filename: Optional[str] = None,
+        content_length: Optional[int] = None,
+    ) -> BinaryIO:
+        if self.ressource_folder is None:
+            return super()._get_file_stream(total_content_length, content_type, filename, content_length)
+        extension = filename.split(".")[-1] if filename else "bin"
+        ressource_file = HashedRessourceFile(self.ressource_folder, uuid4().hex, extension)
+        self._ressource_files.append(ressource_file)
+        return ressource_file
+
+    def close(self):
+        super().close()
+        for ressource_file in self._ressource_files:
+            ressource_file.close()
+            if os.path.exists(ressource_file.file_path):
+                os.remove(ressource_file.file_path)
+
+
+def rename_ressource(file_path: str, file_name: str, extension: str) -> str:
+    """Rename a ressource within its folder and returns the new path"""
+    new_file_path = os.path.join(os.path.dirname(file_path), f"{file_name}.{extension}")
+    logger.debug("Rename ressource {} to {}".format(file_path, new_file_path))
+    os.rename(file_path, new_file_path)
+    return new_file_path
+
+
 def release_ressource(file_name: str, ressource_folder: str):
     """Remove ressource"""
     file_path = os.path.join(ressource_folder, file_name)
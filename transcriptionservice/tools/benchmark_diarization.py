@@ -0,0 +1,76 @@
+"""Compare the speaker assignment of words with the sequential placement rules and with the vectorized one.
+
+Usage: python -m transcriptionservice.tools.benchmark_diarization [--words 100000] [--turns 5000]
+"""
+import argparse
+import copy
+import functools
+import time
+
+import numpy as np
+
+from transcriptionservice.transcription.transcription_result import TranscriptionResult
+
+
+def synthetic_inputs(num_words: int, num_turns: int, seed: int = 0):
+    """Returns words and diarization result of a synthetic meeting: words with gaps, overlaps and punctuations,
+    turns with gaps and overlaps between them"""
+    rng = np.random.default_rng(seed)
+    durations = rng.uniform(0.1, 0.6, num_words)
+    starts = np.cumsum(rng.uniform(0.0, 0.5, num_words) + np.concatenate([[0.0], durations[:-1]]))
+    starts -= rng.uniform(0, 0.05, num_words) * (rng.random(num_words) < 0.1)
+    punctuations = rng.choice(["", "", "", "", ".", "?", ","], num_words)
+    words = [
+        {"word": f"w{i}{punctuation}", "start": float(start), "end": float(start + duration), "conf": 1.0}
+        for i, (start, duration, punctuation) in enumerate(zip(starts, durations, punctuations))
+    ]
+    turn_ends = np.sort(rng.uniform(0, starts[-1] + 1, num_turns))
+    turn_begins = np.concatenate([[0.0], turn_ends[:-1]]) + rng.uniform(-0.5, 0.5, num_turns)
+    segments = [
+        {"seg_begin": float(begin), "seg_end": float(end), "spk_id": int(rng.integers(4)), "seg_id": i}
+        for i, (begin, end) in enumerate(zip(turn_begins, turn_ends))
+    ]
+    return words, {"segments": segments}
+
+
+def word_segment_indexes_sequential(result: TranscriptionResult, precision: float = 0.25) -> np.ndarray:
+    """Returns the index of the diarization segment of each word: each word goes to the first segment, from the
+    segment of the previous word, for which _resolveWordSegment holds (reference of _wordSegmentIndexes)"""
+    seg_index = 0
+    seg_indexes = np.empty(len(result.words), dtype=np.int64)
+    for i in range(len(result.words)):
+        while not result._resolveWordSegment(i, seg_index, precision):
+            # Next segment
+            if seg_index + 1 < len(result.diarizationSegments):
+                seg_index += 1
+            else:
+                break
+        seg_indexes[i] = seg_index
+    return seg_indexes
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark speaker assignment")
+    parser.add_argument("--words", type=int, default=100000, help="Number of words")
+    parser.add_argument("--turns", type=int, default=5000, help="Number of diarization turns")
+    args = parser.parse_args()
+
+    words, diarization = synthetic_inputs(args.words, args.turns)
+    results = {}
+    for name in ["sequential", "vectorized"]:
+        result = TranscriptionResult([({"words": words}, 0.0)])
+        if name == "sequential":
+            result._wordSegmentIndexes = functools.partial(word_segment_indexes_sequential, result)
+        diarization_result = copy.deepcopy(diarization)
+        start = time.perf_counter()
+        result.setDiarizationResult(diarization_result)
+        elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        result._wordSegmentIndexes()
+        assignment_elapsed = time.perf_counter() - start
+        results[name] = [segment.json for segment in result.segments]
+        print(
+            f"{name:<10} {len(result.segments):>6} segments "
+            f"setDiarizationResult {elapsed:.3f}s (word assignment {assignment_elapsed:.3f}s)"
+        )
+    print("Same segments:", results["sequential"] == results["vectorized"])
@@ -0,0 +1,56 @@
+"""Compare the speed and the cut positions of the VAD methods.
+
+Usage: python -m transcriptionservice.tools.benchmark_vad [--mode 1] [--duration 600] [audio.wav ...]
+
+Files must be 16kHz mono 16b PCM wav files (see transcoding). A synthetic signal is used if none is given.
+"""
+import argparse
+import time
+
+import numpy as np
+
+from transcriptionservice.transcription.utils import audio
+from transcriptionservice.transcription.utils.audio import readWav, vadCutIndexes
+
+
+def synthetic_speech(duration: float, sample_rate: int = 16000, seed: int = 0) -> np.ndarray:
+    """Alternate modulated tones (speech) and low noise (silence) of random durations"""
+    rng = np.random.default_rng(seed)
+    signal = rng.normal(0, 100, int(duration * sample_rate))
+    t = 0.0
+    while t < duration:
+        speech, silence = rng.uniform(1, 8), rng.uniform(0.1, 3)
+        start, stop = int(t * sample_rate), int(min(duration, t + speech) * sample_rate)
+        time_ = np.arange(stop - start) / sample_rate
+        signal[start:stop] += 8000 * np.sin(2 * np.pi * 180 * time_) * (1 + 0.5 * np.sin(2 * np.pi * 3 * time_))
+        t += speech + silence
+    return signal.astype(np.int16)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark VAD methods")
+    parser.add_argument("files", nargs="*", help="16kHz mono wav files")
+    parser.add_argument("--mode", type=int, default=1, help="VAD aggressiveness [0-3]")
+    parser.add_argument("--duration", type=float, default=600, help="Duration of the synthetic signal (s)")
+    args = parser.parse_args()
+
+    signals = [(f, *readWav(f)) for f in args.files] or [("synthetic", synthetic_speech(args.duration), 16000)]
+    for name, signal, sample_rate in signals:
+        duration = len(signal) / sample_rate
+        print(f"{name} ({duration:.1f}s)")
+        cut_indexes = {}
+        for method in audio._vad_methods:
+            start = time.perf_counter()
+            cut_indexes[method] = vadCutIndexes(signal, sample_rate, mode=args.mode, method=method)
+            elapsed = time.perf_counter() - start
+            print(f"  {method:<8} {len(cut_indexes[method]):>6} cuts {elapsed:8.3f}s ({duration / elapsed:,.0f}x realtime)")
+        reference = np.array(cut_indexes["WebRTC"])
+        for method, cuts in cut_indexes.items():
+            if method == "WebRTC" or not len(cuts) or not len(reference):
+                continue
+            # Distance of each WebRTC cut to the closest cut of the method
+            distances = np.abs(reference[:, None] - np.array(cuts)[None, :]).min(axis=1) / sample_rate
+            print(
+                f"  {method} vs WebRTC: median {np.median(distances):.2f}s, "
+                f"{np.mean(distances < 0.5):.0%} of WebRTC cuts within 0.5s"
+            )
@@ -109,11 +109,15 @@ class VADConfig(Config):
     ```json
     {
       "enableVAD": boolean (true),
-      "methodName": string ("WebRTC"),
+      "methodName": string ("WebRTC") [WebRTC, Energy],
       "minDuration": float (0.0)
       "maxDuration": float (1200.0),
+      "windowDuration": float (0.0),
+      "windowOverlap": float (2.0)
     }
     ```
+    When VAD is disabled and windowDuration is set, the audio is split in windows of windowDuration seconds
+    overlapping over windowOverlap seconds.
     """
 
     _keys_default = {
@@ -121,6 +125,8 @@ class VADConfig(Config):
         "methodName": "WebRTC",
         "minDuration": 0.0,
         "maxDuration": 1200.0,
+        "windowDuration": 0.0,
+        "windowOverlap": 2.0,
     }
 
     def __init__(self, config: Union[str, dict] = {}):
@@ -135,3 +141,7 @@ class VADConfig(Config):
             pass
         else:
             self.methodName = validate_vad_method(self.methodName)
+        if self.windowDuration and not 0 <= self.windowOverlap < self.windowDuration / 2:
+            raise ValueError(
+                f"windowOverlap ({self.windowOverlap}) must be less than half windowDuration ({self.windowDuration})"
+            )
@@ -1,25 +1,289 @@
 """The transcription_result module holds classes responsible for holding, merging and formating transcription results."""
 import json
 from dataclasses import dataclass, field
-from typing import Dict, List, Tuple, Union, Any
+from typing import Dict, Iterable, Iterator, List, Tuple, Union, Any
+
+import numpy as np
+
+
+class WordTable:
+    """Columnar storage of words: start, end and conf arrays and a list of word strings.
+
+    A WordTable behaves like a list of Word: indexing returns a Word view on a row and slicing returns a new
+    WordTable. Offsetting, sorting, concatenating and averaging are applied on whole columns.
+    Modifications through the table or its Word views increment its version, so that values computed from
+    the words can be checked for staleness. The column arrays and lists are not tracked.
+    """
+
+    __slots__ = ("_text", "_start", "_end", "_conf", "_version")
+
+    def __init__(
+        self,
+        text: List[str] = None,
+        start: np.ndarray = None,
+        end: np.ndarray = None,
+        conf: np.ndarray = None,
+    ):
+        self._text = list(text) if text is not None else []
+        self._start = np.asarray(start if start is not None else [], dtype=np.float64)
+        self._end = np.asarray(end if end is not None else [], dtype=np.float64)
+        self._conf = np.asarray(conf if conf is not None else [], dtype=np.float64)
+        self._version = 0
+
+    @classmethod
+    def _fromColumns(cls, text: List[str], start: np.ndarray, end: np.ndarray, conf: np.ndarray) -> "WordTable":
+        """Creates a table owning the given columns, without copy"""
+        table = cls.__new__(cls)
+        table._text, table._start, table._end, table._conf = text, start, end, conf
+        table._version = 0
+        return table
+
+    @classmethod
+    def fromDicts(cls, words: List[dict], offset: float = 0.0) -> "WordTable":
+        """Creates a table from a list of {"word", "start", "end", "conf"} applying an offset"""
+        num_words = len(words)
+        table = cls._fromColumns(
+            [w["word"] for w in words],
+            np.fromiter((w["start"] for w in words), dtype=np.float64, count=num_words),
+            np.fromiter((w["end"] for w in words), dtype=np.float64, count=num_words),
+            np.fromiter((w["conf"] for w in words), dtype=np.float64, count=num_words),
+        )
+        if offset:
+            table.apply_offset(offset)
+        return table
+
+    @classmethod
+    def fromWords(cls, words: Union["WordTable", Iterable["Word"]]) -> "WordTable":
+        """Returns words as a table, without copy if it is already one"""
+        if isinstance(words, WordTable):
+            return words
+        words = list(words)
+        return cls(
+            [w.word for w in words],
+            [w.start for w in words],
+            [w.end for w in words],
+            [w.conf for w in words],
+        )
+
+    @classmethod
+    def concatenate(cls, tables: Iterable["WordTable"]) -> "WordTable":
+        tables = list(tables)
+        if not tables:
+            return cls()
+        return cls._fromColumns(
+            [text for table in tables for text in table._text],
+            np.concatenate([table._start for table in tables]),
+            np.concatenate([table._end for table in tables]),
+            np.concatenate([table._conf for table in tables]),
+        )
+
+    @classmethod
+    def merge(cls, tables: Iterable["WordTable"]) -> "WordTable":
+        """Merges tables into a table sorted by start, as concatenate then sort would.
+
+        Tables are concatenated in start order. Only tables whose start ranges overlap are concatenated in
+        their given order and sorted together, which merges their sorted runs.
+        """
+        tables = [table for table in tables if len(table)]
+        first_starts = [float(table._start.min()) for table in tables]
+        last_starts = [float(table._start.max()) for table in tables]
+        merged = []
+        group = []  # Indexes of tables overlapping each other
+        group_last_start = None
+        for index in sorted(range(len(tables)), key=lambda i: first_starts[i]):
+            if group and first_starts[index] > group_last_start:
+                merged.append(cls._sortedGroup([tables[i] for i in sorted(group)]))
+                group = []
+            if not group or last_starts[index] > group_last_start:
+                group_last_start = last_starts[index]
+            group.append(index)
+        if group:
+            merged.append(cls._sortedGroup([tables[i] for i in sorted(group)]))
+        return cls.concatenate(merged)
+
+    @classmethod
+    def _sortedGroup(cls, tables: List["WordTable"]) -> "WordTable":
+        """Returns the words of tables sorted by start, without copy for a single sorted table"""
+        if len(tables) == 1 and tables[0]._isSorted():
+            return tables[0]
+        table = cls.concatenate(tables)
+        table.sort()
+        return table
+
+    @property
+    def words(self) -> List[str]:
+        return self._text
+
+    @property
+    def starts(self) -> np.ndarray:
+        return self._start
+
+    @property
+    def ends(self) -> np.ndarray:
+        return self._end
+
+    @property
+    def confs(self) -> np.ndarray:
+        return self._conf
+
+    @property
+    def version(self) -> int:
+        """Number of modifications of the table"""
+        return self._version
+
+    def apply_offset(self, offset: float):
+        self._start += offset
+        self._end += offset
+        self._version += 1
+
+    def sort(self):
+        """Sorts words by start time (stable)"""
+        if self._isSorted():
+            return
+        table = self._take(np.argsort(self._start, kind="stable"))
+        self._text, self._start, self._end, self._conf = table._text, table._start, table._end, table._conf
+        self._version += 1
+
+    def _take(self, indexes: np.ndarray) -> "WordTable":
+        """Returns a new table with the words at indexes"""
+        return WordTable._fromColumns(
+            [self._text[i] for i in indexes.tolist()],
+            self._start[indexes],
+            self._end[indexes],
+            self._conf[indexes],
+        )
+
+    def _isSorted(self) -> bool:
+        return not np.any(self._start[1:] < self._start[:-1])
+
+    def mean_conf(self) -> float:
+        return float(self._conf.mean()) if len(self._conf) else 0.0
+
+    def append(self, word: "Word"):
+        self.extend(WordTable([word.word], [word.start], [word.end], [word.conf]))
+
+    def extend(self, words: Union["WordTable", Iterable["Word"]]):
+        words = WordTable.fromWords(words)
+        self._text.extend(words._text)
+        self._start = np.concatenate([self._start, words._start])
+        self._end = np.concatenate([self._end, words._end])
+        self._conf = np.concatenate([self._conf, words._conf])
+        self._version += 1
+
+    def __iadd__(self, words: Union["WordTable", Iterable["Word"]]) -> "WordTable":
+        self.extend(words)
+        return self
+
+    def __len__(self) -> int:
+        return len(self._text)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union["Word", "WordTable"]:
+        if isinstance(index, slice):
+            return WordTable._fromColumns(
+                self._text[index], self._start[index].copy(), self._end[index].copy(), self._conf[index].copy()
+            )
+        if index < 0:
+            index += len(self._text)
+        if not 0 <= index < len(self._text):
+            raise IndexError("WordTable index out of range")
+        return Word._view(self, index)
+
+    def __iter__(self) -> Iterator["Word"]:
+        for index in range(len(self._text)):
+            yield Word._view(self, index)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, WordTable):
+            return (
+                self._text == other._text
+                and np.array_equal(self._start, other._start)
+                and np.array_equal(self._end, other._end)
+                and np.array_equal(self._conf, other._conf)
+            )
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"WordTable({list(self)})"
+
+    @property
+    def json(self) -> List[dict]:
+        return [
+            {"word": word, "start": start, "end": end, "conf": conf}
+            for word, start, end, conf in zip(
+                self._text, self._start.tolist(), self._end.tolist(), self._conf.tolist()
+            )
+        ]
 
 
-@dataclass
 class Word:
-    """Contains word informations"""
+    """Contains word informations, as a view on a row of a WordTable"""
+
+    __slots__ = ("_table", "_index")
+
+    def __init__(self, word: str, start: float, end: float, conf: float):
+        self._table = WordTable([word], [start], [end], [conf])
+        self._index = 0
+
+    @classmethod
+    def _view(cls, table: WordTable, index: int) -> "Word":
+        word = cls.__new__(cls)
+        word._table = table
+        word._index = index
+        return word
+
+    @property
+    def word(self) -> str:
+        return self._table._text[self._index]
+
+    @word.setter
+    def word(self, value: str):
+        self._table._text[self._index] = value
+        self._table._version += 1
+
+    @property
+    def start(self) -> float:
+        return float(self._table._start[self._index])
+
+    @start.setter
+    def start(self, value: float):
+        self._table._start[self._index] = value
+        self._table._version += 1
+
+    @property
+    def end(self) -> float:
+        return float(self._table._end[self._index])
+
+    @end.setter
+    def end(self, value: float):
+        self._table._end[self._index] = value
+        self._table._version += 1
 
-    word: str
-    start: float
-    end: float
-    conf: float
+    @property
+    def conf(self) -> float:
+        return float(self._table._conf[self._index])
+
+    @conf.setter
+    def conf(self, value: float):
+        self._table._conf[self._index] = value
+        self._table._version += 1
 
     def apply_offset(self, offset: float):
         self.start += offset
         self.end += offset
 
+    def __eq__(self, other) -> bool:
+        if isinstance(other, Word):
+            return self.json == other.json
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"Word(word={self.word!r}, start={self.start!r}, end={self.end!r}, conf={self.conf!r})"
+
     @property
     def json(self) -> dict:
-        return self.__dict__
+        return {"word": self.word, "start": self.start, "end": self.end, "conf": self.conf}
 
 
 @dataclass
@@ -38,10 +302,51 @@ class DiarizationSegment:
 
 @dataclass
 class SpeechSegment:
+    """Contains the words of a speaker turn.
+
+    Bounds and raw text are computed once and maintained by append and extend. They are recomputed if words
+    are replaced or modified otherwise (see WordTable.version), or after invalidate.
+    """
+
     speaker_id: str = None
-    words: list = field(default_factory=list)
+    words: WordTable = field(default_factory=WordTable)
     processed_segment = None
 
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name == "words":
+            self.invalidate()
+
+    def invalidate(self):
+        """Resets cached bounds and text"""
+        self._bounds = None
+        self._joined_words = None
+        self._words_version = None  # Version of words the cache was computed from
+
+    def _checkCache(self):
+        """Resets cached bounds and text if words were modified since they were computed"""
+        if self._words_version != self.words.version:
+            self.invalidate()
+            self._words_version = self.words.version
+
+    def append(self, word: Word):
+        self.extend([word])
+
+    def extend(self, words: Union[WordTable, Iterable[Word]]):
+        """Appends words, updating cached bounds and text from the new words only"""
+        words = WordTable.fromWords(words)
+        if not len(words):
+            return
+        self._checkCache()
+        bounds, joined_words, num_words = self._bounds, self._joined_words, len(self.words)
+        self.words.extend(words)
+        self._words_version = self.words.version
+        if bounds is not None:
+            start, end = float(words.starts.min()), float(words.ends.max())
+            self._bounds = (min(bounds[0], start), max(bounds[1], end)) if num_words else (start, end)
+        if joined_words is not None:
+            self._joined_words = " ".join(([joined_words] if num_words else []) + words.words)
+
     def toString(self, include_spkid: bool = False, spk_sep: str = ":"):
         output = (
             f"{self.speaker_id}{spk_sep} "
@@ -56,81 +361,163 @@ class SpeechSegment:
 
     @property
     def raw_segment(self) -> str:
-        return " ".join([w.word for w in self.words]).strip()
+        self._checkCache()
+        if self._joined_words is None:
+            self._joined_words = " ".join(self.words.words)
+        return self._joined_words.strip()
+
+    @property
+    def bounds(self) -> Tuple[float, float]:
+        """(start, end) of the segment"""
+        self._checkCache()
+        if self._bounds is None:
+            self._bounds = (
+                (float(self.words.starts.min()), float(self.words.ends.max()))
+                if len(self.words) > 0
+                else (0.0, 0.0)
+            )
+        return self._bounds
 
     @property
     def start(self) -> float:
-        return min([w.start for w in self.words]) if len(self.words) > 0 else 0.0
+        return self.bounds[0]
 
     @property
     def end(self) -> float:
-        return max([w.end for w in self.words]) if len(self.words) > 0 else 0.0
+        return self.bounds[1]
 
     @property
     def duration(self) -> float:
-        return self.end - self.start
+        start, end = self.bounds
+        return end - start
 
     @property
     def json(self) -> dict:
+        raw_segment = self.raw_segment
         return {
             "spk_id": self.speaker_id,
             "start": self.start,
             "end": self.end,
             "duration": self.duration,
-            "raw_segment": self.raw_segment,
+            "raw_segment": raw_segment,
             "segment": self.processed_segment
             if self.processed_segment is not None
-            else self.raw_segment,
-            "words": [w.json for w in self.words],
+            else raw_segment,
+            "words": self.words.json,
         }
 
 
 class TranscriptionResult:
     """Transcription result manages transcription results, post-processing and formating for transcription results."""
 
-    def __init__(self, transcriptions: List[Tuple[dict, float]], spk_ids: list = None):
-        """Initialisation accepts list of tuple (transcription, time_offset)"""
+    def __init__(
+        self, transcriptions: List[Tuple[dict, float]], spk_ids: list = None, overlap: float = 0.0
+    ):
+        """Initialisation accepts list of tuple (transcription, time_offset).
+        overlap is the duration in seconds over which consecutive transcriptions overlap.
+
+        Transcriptions can also be added one by one as they complete with addTranscription, then merged
+        with mergeTranscriptions.
+        """
         self.transcription_confidence = 0.0
-        self.words = []
+        self.words = WordTable()
         self.segments = []
         self.diarizationSegments = []
+        self._chunks = []  # Transcriptions added by addTranscription: [(words, offset, index)] with chunk timestamps
         if transcriptions:
-            self._mergeTranscription(transcriptions, spk_ids)
+            self._mergeTranscription(
+                [
+                    (WordTable.fromDicts(transcription["words"]), offset)
+                    for transcription, offset in transcriptions
+                ],
+                spk_ids,
+                overlap,
+            )
+
+    def addTranscription(self, transcription: dict, offset: float, index: int = None):
+        """Adds the transcription of the chunk starting at offset, in any order.
+        index is the position of the chunk in the dispatch order (addition order if not set): chunks starting
+        at the same offset are merged in that order."""
+        index = len(self._chunks) if index is None else index
+        self._chunks.append((WordTable.fromDicts(transcription["words"]), offset, index))
+
+    def _sortedChunks(self) -> List[Tuple[WordTable, float]]:
+        """Returns the (words, offset) of the transcriptions added so far ordered by offset and index"""
+        return [(words, offset) for words, offset, _ in sorted(self._chunks, key=lambda x: (x[1], x[2]))]
+
+    def partial_words(self, overlap: float = 0.0) -> WordTable:
+        """Returns the words of the transcriptions added so far, sorted by start"""
+        chunks = self._sortedChunks()
+        if overlap:
+            chunks = self._resolveOverlaps(chunks, overlap)
+        return WordTable.merge(self._offsetWords(words, offset) for words, offset in chunks)
+
+    def mergeTranscriptions(self, spk_ids: list = None, overlap: float = 0.0):
+        """Merges the transcriptions added with addTranscription ordered by offset and index, as the initialisation
+        does. spk_ids are the speaker of each transcription in that order."""
+        chunks, self._chunks = self._sortedChunks(), []
+        self._mergeTranscription(chunks, spk_ids, overlap)
+
+    @staticmethod
+    def _offsetWords(words: WordTable, offset: float) -> WordTable:
+        """Returns a copy of words with the offset applied"""
+        words = WordTable._fromColumns(list(words.words), words.starts.copy(), words.ends.copy(), words.confs.copy())
+        if offset:
+            words.apply_offset(offset)
+        return words
+
+    @staticmethod
+    def _resolveOverlaps(
+        transcriptions: List[Tuple[WordTable, float]], overlap: float
+    ) -> List[Tuple[WordTable, float]]:
+        """Removes duplicated words from overlapping transcriptions.
+
+        Consecutive transcriptions are cut in the middle of their overlap: a word is kept in the transcription
+        in which its middle falls before the cut, or after the previous one. Words whose timestamps shifted
+        across the cut are removed if they repeat the last kept word.
+        """
+        transcriptions = sorted(transcriptions, key=lambda x: x[1])
+        resolved = []
+        for i, (words, offset) in enumerate(transcriptions):
+            cut_start = offset + overlap / 2 if i else float("-inf")
+            cut_end = (
+                transcriptions[i + 1][1] + overlap / 2 if i + 1 < len(transcriptions) else float("inf")
+            )
+            middles = offset + (words.starts + words.ends) / 2
+            words = words._take(np.flatnonzero((cut_start <= middles) & (middles < cut_end)))
+            if len(words) and resolved and len(resolved[-1][0]):
+                previous_words, previous_offset = resolved[-1]
+                if (
+                    words.words[0] == previous_words.words[-1]
+                    and offset + words.starts[0] < previous_offset + previous_words.ends[-1]
+                ):
+                    words = words[1:]
+            resolved.append((words, offset))
+        return resolved
 
     def _mergeTranscription(
-        self, transcriptions: List[Tuple[dict, float]], spk_ids: list = None
+        self, transcriptions: List[Tuple[WordTable, float]], spk_ids: list = None, overlap: float = 0.0
     ) -> None:
-        """Merges transcription results applying offsets"""
-        self.transcription_confidence = 0.0
-        num_words = 0
-        for transcription, offset in transcriptions:
-            for w in transcription["words"]:
-                word = Word(**w)
-                word.apply_offset(offset)
-                self.words.append(word)
-                self.transcription_confidence += word.conf
-            num_words += len(transcription["words"])
-        if num_words:
-            self.transcription_confidence /= num_words
-        self.words.sort(key=lambda x: x.start)
+        """Merges transcription results applying offsets to their words"""
+        if overlap:
+            transcriptions = self._resolveOverlaps(transcriptions, overlap)
+        tables = []
+        for words, offset in transcriptions:
+            if offset:
+                words.apply_offset(offset)
+            tables.append(words)
+        self.words = WordTable.merge(tables)
+        self.transcription_confidence = self.words.mean_conf()
 
         if spk_ids:
-            for (transcription, offset), id in zip(transcriptions, spk_ids):
-                seg_words = []
-                for w in transcription["words"]:
-                    word = Word(**w)
-                    word.apply_offset(offset)
-                    seg_words.append(word)
-                if seg_words:
-                    self.segments.append(SpeechSegment(id, seg_words))
+            for table, id in zip(tables, spk_ids):
+                if len(table):
+                    self.segments.append(SpeechSegment(id, table))
             self.segments = sorted(self.segments, key=lambda seg: seg.start)
 
     def setTranscription(self, words: List[dict]):
-        for w in words:
-            self.words.append(Word(**w))
-        self.transcription_confidence = sum([w.conf for w in self.words]) / len(
-            self.words
-        ) if len(self.words) else 0.0
+        self.words.extend(WordTable.fromDicts(words))
+        self.transcription_confidence = self.words.mean_conf()
 
     def setDiarizationResult(self, diarizationResult: Union[str, dict]):
         """Create speech segments using word and diarization data"""
@@ -152,7 +539,7 @@ class TranscriptionResult:
         self.diarizationSegments = [self.diarizationSegments[i] for i in range(len(self.diarizationSegments)) \
             if i == 0 or self.diarizationSegments[i].seg_end > self.diarizationSegments[i-1].seg_end]
 
-        self.words.sort(key=lambda x: x.start)
+        self.words.sort()
 
         # Interpolates speaker change timestamps
         # Starts the first segment at 0.0, ends the last segment at max(word.ends)
@@ -173,34 +560,61 @@ class TranscriptionResult:
                 )
                 first_segment.seg_end = second_segment.seg_begin = middle_point
 
-        seg_index = 0
-        previous_id = None
-        current_id = self.diarizationSegments[seg_index].spk_id
-        current_words = []
-
-        # Iterate over segments and words to create speech segments
-        for i, word in enumerate(self.words):
-            while not self._resolveWordSegment(i, seg_index):
-                # Next segment
-                if seg_index + 1 < len(self.diarizationSegments):
-                    seg_index += 1
-                    next_id = self.diarizationSegments[seg_index].spk_id
+        # Group consecutive words of the same diarization segment, then consecutive groups of the same speaker
+        seg_indexes = self._wordSegmentIndexes()
+        group_starts = (np.flatnonzero(np.diff(seg_indexes)) + 1).tolist()
+        speech_bounds = []  # [spk_id, first word index, last word index + 1]
+        for group_start, group_end in zip([0] + group_starts, group_starts + [len(self.words)]):
+            if group_start == group_end:
+                continue
+            spk_id = self.diarizationSegments[seg_indexes[group_start]].spk_id
+            if speech_bounds and speech_bounds[-1][0] == spk_id:
+                speech_bounds[-1][2] = group_end
+            else:
+                speech_bounds.append([spk_id, group_start, group_end])
+
+        for spk_id, start, end in speech_bounds:
+            self.segments.append(SpeechSegment(spk_id, self.words[start:end]))
+
+    def _wordSegmentIndexes(self, precision: float = 0.25) -> np.ndarray:
+        """Returns the index of the diarization segment of each word.
+
+        Each word goes to the first segment, from the segment of the previous word, for which _resolveWordSegment
+        holds. Diarization segments are iterated over instead of words (see tools/benchmark_diarization.py):
+        words ending before the segment end minus precision belong to the segment whatever their position, so
+        searchsorted over the running maximum of word ends skips them, and the placement rules of
+        _resolveWordSegment are only applied on the words straddling the segment end.
+        """
+        num_words = len(self.words)
+        seg_indexes = np.full(num_words, len(self.diarizationSegments) - 1, dtype=np.int64)
+        if not num_words:
+            return seg_indexes
+        seg_ends = np.array([seg.seg_end for seg in self.diarizationSegments[:-1]], dtype=np.float64)
+        # Same comparisons as in _resolveWordSegment
+        within_bounds = seg_ends - precision
+        outside_bounds = seg_ends + precision
+        # Index of the first word that may not be completely within each segment
+        first_candidates = np.searchsorted(np.maximum.accumulate(self.words.ends), within_bounds, side="right")
+        starts, ends = self.words.starts.tolist(), self.words.ends.tolist()
+        word_index = 0
+        for seg_index, (first_candidate, within_bound, outside_bound) in enumerate(
+            zip(first_candidates.tolist(), within_bounds.tolist(), outside_bounds.tolist())
+        ):
+            next_word = max(word_index, first_candidate)
+            while next_word < num_words:
+                if ends[next_word] <= within_bound:
+                    next_word += 1
+                elif starts[next_word] >= outside_bound:
+                    break
+                elif self._resolveWordSegment(next_word, seg_index, precision):
+                    next_word += 1
                 else:
                     break
-                if len(current_words):
-                    if current_id != previous_id: # Flush current segment
-                        self.segments.append(SpeechSegment(current_id, current_words))
-                    else: # Merge with previous segment
-                        self.segments[-1].words += current_words
-                    previous_id = current_id
-                current_id = next_id
-                current_words = []
-            current_words.append(word)
-        if len(current_words):
-            if current_id != previous_id: # Flush current segment
-                self.segments.append(SpeechSegment(current_id, current_words))
-            else: # Merge with previous segment
-                self.segments[-1].words += current_words
+            seg_indexes[word_index:next_word] = seg_index
+            word_index = next_word
+            if word_index == num_words:
+                break
+        return seg_indexes
 
     def _resolveWordSegment(
         self,
@@ -220,9 +634,9 @@ class TranscriptionResult:
             # Stay on current segment if it is the last one
             return True
 
-        word = self.words[word_index]
-        word_start = word.start
-        word_end = word.end
+        starts, ends, texts = self.words.starts, self.words.ends, self.words.words
+        word_start = float(starts[word_index])
+        word_end = float(ends[word_index])
         current_diarization_seg = self.diarizationSegments[diarization_index]
 
         # Word completely within current segment
@@ -238,23 +652,23 @@ class TranscriptionResult:
         if not word_index:
             # Assign first word to first segment
             return True
-        if word_index == len(self.words) - 1:
+        if word_index == len(texts) - 1:
             # Assign last word to last segment
             return False
 
         # Decide based on the distance with the previous and the next words
         # if one exceeds a certain threshold seconds
-        gap_previous_word = word_start - self.words[word_index - 1].end
-        gap_next_word = self.words[word_index + 1].start - word_end
+        gap_previous_word = word_start - float(ends[word_index - 1])
+        gap_next_word = float(starts[word_index + 1]) - word_end
         if max(gap_previous_word, gap_next_word) >= precision:
             return gap_previous_word <= gap_next_word
 
         if word_index > 0:
             # If the previous word ends with a punctuation, cut there
-            previous_word = self.words[word_index - 1]
-            if previous_word.word and previous_word.word[-1] in ".!?":
+            previous_word = texts[word_index - 1]
+            if previous_word and previous_word[-1] in ".!?":
                 return False
-            elif word.word and word.word[-1] in ".!?":
+            elif texts[word_index] and texts[word_index][-1] in ".!?":
                 return True
 
         # Otherwise, look at what happens with the next segment
@@ -302,7 +716,7 @@ class TranscriptionResult:
         Returns:
             str: Transcription without any other processing
         """
-        return " ".join([w.word for w in self.words]).strip()
+        return " ".join(self.words.words).strip()
 
     @classmethod
     def fromDict(cls, resultDict: dict):
@@ -311,10 +725,11 @@ class TranscriptionResult:
         result.transcription_confidence = resultDict["confidence"]
         for segment in resultDict["segments"]:
             seg = SpeechSegment(
-                segment["spk_id"], [Word(**w) for w in segment["words"]]
+                segment["spk_id"], WordTable.fromDicts(segment["words"])
             )
             seg.processed_segment = segment["segment"]
             result.segments.append(seg)
+        result.words = WordTable.merge(seg.words for seg in result.segments)
 
         result.diarizationSegments = [
             DiarizationSegment(**diarizationSegment)
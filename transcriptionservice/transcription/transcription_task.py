@@ -1,16 +1,29 @@
 """ The transcription_task module implements the transcription's task steps to be served by the request celery workers."""
+import hashlib
+import json
 import logging
 import os
 import time
+from typing import Iterable, Iterator, Tuple
 import celery.states as celery_states
+from celery import chain, chord
+from celery.result import ResultSet
 
 from transcriptionservice.broker.celeryapp import celery
+from transcriptionservice.broker.discovery import queue_concurrency
 from transcriptionservice.server.mongodb.db_client import DBClient
 from transcriptionservice.transcription.configs.transcriptionconfig import (
     TranscriptionConfig,
 )
 from transcriptionservice.transcription.transcription_result import TranscriptionResult
 from transcriptionservice.transcription.utils.audio import (
+    chunkSampleRange,
+    durationStats,
+    iterSplitFile,
+    iterSplitWindows,
+    pcmChunkFingerprint,
+    pcmFingerprint,
+    readWav,
     splitFile,
     splitUsingTimestamps,
     transcoding,
@@ -25,7 +38,13 @@ from transcriptionservice.transcription.utils.taskprogression import (
     TaskProgression,
 )
 
-__all__ = ["transcription_task"]
+__all__ = [
+    "transcription_task",
+    "transcription_merge_task",
+    "transcription_finalize_task",
+    "transcription_cleanup_task",
+    "transcription_chunk_cache_task",
+]
 
 # Create shared mongoclient
 db_info = {
@@ -37,9 +56,59 @@ db_info = {
 
 language = os.environ.get("LANGUAGE", None)
 
+# Send chunks as references to the transcoded file instead of writing subfiles
+CHUNK_REFERENCES = os.environ.get("CHUNK_REFERENCES", "0").lower() in ["1", "true"]
+
+# Duration in seconds during which a final result is reused for identical requests (0 disables the cache)
+RESULT_CACHE_TTL = int(os.environ.get("RESULT_CACHE_TTL", 7 * 24 * 3600))
+
+# Merge VAD segments into chunks balanced over the STT workers, dispatched longest first
+CHUNK_PLANNING = os.environ.get("CHUNK_PLANNING", "0").lower() in ["1", "true"]
+# Total STT concurrency used for planning, fetched from the service registry if not set
+STT_CONCURRENCY = int(os.environ.get("STT_CONCURRENCY") or 0)
+
+# Duration in seconds during which chunk transcriptions are reused for identical audio chunks (0 disables the cache)
+CHUNK_CACHE_TTL = int(os.environ.get("CHUNK_CACHE_TTL", 7 * 24 * 3600))
+# Maximum number of chunks looked up at once in the chunk cache while the file is being split
+CHUNK_LOOKUP_BATCH = 64
+
+# Interval in seconds between checkpoints of the words transcribed so far while chunks complete (0 disables checkpoints)
+CHECKPOINT_INTERVAL = float(os.environ.get("CHECKPOINT_INTERVAL") or 0)
+# Duration in seconds after which the checkpoint of a job that did not complete expires
+PARTIAL_TRANSCRIPTION_TTL = 24 * 3600
+
 db_client = DBClient(db_info)
 
 
+class OrchestrationMode:
+    """Enumeration of transcription task orchestration modes."""
+
+    BLOCKING = "blocking"  # The request worker waits for the subtask results
+    EVENT = "event"  # Subtask results are collected by callback tasks, the request worker is released while waiting
+
+    @classmethod
+    def from_env(cls) -> str:
+        """Returns environement defined orchestration mode.
+
+        Returns:
+            str: Environement defined orchestration mode (default BLOCKING)
+        """
+        env_mode = os.environ.get("ORCHESTRATION_MODE", "blocking").lower()
+        return {"blocking": cls.BLOCKING, "event": cls.EVENT}.get(env_mode, cls.BLOCKING)
+
+
+def _setup_logging(job_id: str):
+    """Redirect logs to the job log file"""
+    logging.basicConfig(
+        filename=f"/usr/src/app/logs/{job_id}.txt",
+        filemode="a",
+        format="%(asctime)s,%(levelname)s %(message)s",
+        datefmt="%H:%M:%S",
+        level=logging.DEBUG,
+        force=True,
+    )
+
+
 @celery.task(name="transcription_task", bind=True)
 def transcription_task(self, task_info: dict, file_path: str):
     """Transcription task processes a transcription request.
@@ -53,14 +122,7 @@ def transcription_task(self, task_info: dict, file_path: str):
     - "timestamps" : (Optionnal) Audio spliting timestamps
     """
     # Logging task
-    logging.basicConfig(
-        filename=f"/usr/src/app/logs/{self.request.id}.txt",
-        filemode="a",
-        format="%(asctime)s,%(levelname)s %(message)s",
-        datefmt="%H:%M:%S",
-        level=logging.DEBUG,
-        force=True,
-    )
+    _setup_logging(self.request.id)
 
     logging.info(f"Running task {self.request.id}")
 
@@ -88,6 +150,18 @@ def transcription_task(self, task_info: dict, file_path: str):
             logging.error(str(error))
             raise ResolveException(f"Failed to resolve: {str(error)}")
 
+    # Check for available result
+    task_info["result_key"] = _result_key(task_info, config) if RESULT_CACHE_TTL else None
+    result_id = _fetch_cached_result_id(task_info["result_key"])
+    if result_id is not None:
+        logging.info(f"Result already available for identical request: {result_id}")
+        if not task_info["keep_audio"]:
+            try:
+                os.remove(file_path)
+            except Exception as e:
+                logging.warning("Failed to remove ressource {}".format(file_path))
+        return result_id
+
     # Task progression
     progress = TaskProgression(
         [
@@ -105,12 +179,13 @@ def transcription_task(self, task_info: dict, file_path: str):
     ## Transtyping
     logging.info(f"Converting input file to wav.")
     file_name = transcoding(file_path)
+    task_info["pcm_hash"] = _pcm_hash(file_name, config, task_info["timestamps"])
 
     # Check for available transcription
-    logging.info(f"Checking for available transcription for {task_info['hash']}")
+    logging.info(f"Checking for available transcription for {task_info['hash']} (PCM {task_info['pcm_hash']})")
 
     if not task_info["timestamps"]:
-        available_transcription = db_client.fetch_transcription(task_info["hash"])
+        available_transcription = db_client.fetch_transcription(task_info["hash"], task_info["pcm_hash"])
     else:
         available_transcription = None
 
@@ -127,60 +202,32 @@ def transcription_task(self, task_info: dict, file_path: str):
     self.update_state(state="STARTED", meta=progress.toDict())
 
     if available_transcription is None:
-        # Split using VAD
-        if task_info["timestamps"]:
-            logging.info(f"Split using provided timestamps ...")
-            subfiles, total_duration = splitUsingTimestamps(
-                file_name, task_info["timestamps"]
-            )
-            logging.info(f"Input file has been split into {len(subfiles)} subfiles")
-        elif not config.vadConfig.isEnabled:
-            logging.info(f"Split in one chunk (VAD disabled)")
-            total_duration = getDuration(file_name)
-            subfiles = [(file_name, 0.0, total_duration)]
+        # Timestamps segments are kept in order: speaker turns starting together are told apart by their position
+        if CHUNK_PLANNING and not task_info["timestamps"]:
+            stt_concurrency = _stt_concurrency(task_info["service_name"])
         else:
-            logging.info(f"Splitting using VAD ...")
-            if config.vadConfig.minDuration:
-                # Values for ASR like Whisper which pad small segments anyway
-                kwargs = {
-                    "min_segment_duration": config.vadConfig.minDuration,
-                    "max_segment_duration": config.vadConfig.maxDuration,
-                    "min_length": config.vadConfig.minDuration,
-                    # "min_silence": 0.6,
-                }
-            else:
-                # Historical values for Kaldi
-                kwargs = {
-                    "min_segment_duration": None,
-                    "max_segment_duration": 1200.0, # New, to avoid memory errors
-                    "min_length": 10,
-                    # "min_silence": 0.6,
-                }
-            subfiles, stats_duration = splitFile(
-                file_name,
-                method=config.vadConfig.methodName,
-                **kwargs,
-            )
-            total_duration = stats_duration["total"]
-            logging.info(f"Split in {len(subfiles)} chunks of around {config.vadConfig.minDuration} seconds ({', '.join([k+'='+str(round(v, 2)) for k,v in stats_duration.items()])})")
-
-        # Progress monitoring
-        speakers = None
-        progress.steps["preprocessing"].state = StepState.DONE
-        self.update_state(state="STARTED", meta=progress.toDict())
-
-        # Transcription
-        transJobIds = []
-        progress.steps["transcription"].state = StepState.STARTED
-        for subfile_path, offset, duration in subfiles:
-            transJobId = celery.send_task(
-                name="transcribe_task",
-                queue=task_info["service_name"],
-                args=[subfile_path, True],
-            )
-            transJobIds.append((transJobId, offset, duration, subfile_path))
+            stt_concurrency = 0
+        # Subfiles are yielded as soon as they are cut
+        subfiles = _split_audio(file_name, config, task_info["timestamps"], stt_concurrency)
+        if stt_concurrency:
+            # Longest processing time first: short chunks fill the gaps at the end of the job
+            subfiles = sorted(subfiles, key=lambda subfile: subfile[2], reverse=True)
 
+    # Event orchestration: subtasks results are collected by transcription_merge_task
+    if OrchestrationMode.from_env() == OrchestrationMode.EVENT:
+        if available_transcription is None:
+            subfiles = list(subfiles)
+            _log_split(subfiles)
+            progress.steps["preprocessing"].state = StepState.DONE
+        workflow = _event_workflow(
+            task_info,
+            config,
+            progress,
+            file_name,
+            subfiles if available_transcription is None else None,
+        )
         self.update_state(state="STARTED", meta=progress.toDict())
+        return self.replace(workflow)
 
     # Diarization (In parallel)
     if config.diarizationConfig.isEnabled:
@@ -199,47 +246,77 @@ def transcription_task(self, task_info: dict, file_path: str):
         )
         self.update_state(state="STARTED", meta=progress.toDict())
 
+    if available_transcription is None:
+        # Transcription (dispatched while the rest of the file is being split)
+        transcription_result = TranscriptionResult(None)
+        transJobIds = []
+        chunkHashes = []
+        chunkIndexes = []  # Position of the chunks in the dispatch order
+        cached_chunks = []  # Chunks already transcribed: [(offset, duration)]
+        audio, sample_rate = readWav(file_name)
+        # Chunks are looked up in the chunk cache by batches
+        for batch in _iter_batches(enumerate(subfiles), CHUNK_LOOKUP_BATCH if CHUNK_CACHE_TTL else 1):
+            batch_hashes = [
+                pcmChunkFingerprint(audio, offset, duration, sample_rate) if CHUNK_CACHE_TTL else None
+                for _, (_, offset, duration) in batch
+            ]
+            available = _fetch_chunk_transcriptions(batch_hashes)
+            for (index, (subfile_path, offset, duration)), chunk_hash in zip(batch, batch_hashes):
+                transcription = available.get(chunk_hash)
+                if transcription is not None:
+                    if subfile_path != file_name and os.path.exists(subfile_path):
+                        os.remove(subfile_path)
+                    transcription_result.addTranscription(transcription, offset, index)
+                    cached_chunks.append((offset, duration))
+                    continue
+                transJobId = celery.send_task(
+                    name="transcribe_task",
+                    queue=task_info["service_name"],
+                    args=[subfile_path, True],
+                    kwargs=_transcribe_kwargs(offset, duration, sample_rate),
+                )
+                transJobIds.append((transJobId, offset, duration, subfile_path))
+                chunkHashes.append(chunk_hash)
+                chunkIndexes.append(index)
+                if len(transJobIds) == 1:
+                    progress.steps["transcription"].state = StepState.STARTED
+                    self.update_state(state="STARTED", meta=progress.toDict())
+        del audio
+        total_duration = _log_split(
+            [(subfile_path, offset, duration) for _, offset, duration, subfile_path in transJobIds]
+            + [(None, offset, duration) for offset, duration in cached_chunks]
+        )["total"]
+        if cached_chunks:
+            logging.info(f"{len(cached_chunks)} chunks already transcribed")
+            progress.steps["transcription"].progress += (
+                sum(duration for _, duration in cached_chunks) / total_duration
+            )
+
+        # Progress monitoring
+        progress.steps["preprocessing"].state = StepState.DONE
+        self.update_state(state="STARTED", meta=progress.toDict())
+
     # Wait for all the transcription jobs
     if available_transcription is None:
-        transcriptions = []
-        failed = False
-        transcription = None
-        for jobId, offset, duration, subfile_path in transJobIds:
-            if failed:
-                if subfile_path != file_name and os.path.exists(subfile_path):
-                    os.remove(subfile_path)
-                jobId.revoke()
-                continue
-            transcription = jobId.get(disable_sync_subtasks=False)
-            if subfile_path != file_name and os.path.exists(subfile_path):
-                os.remove(subfile_path)
-            if jobId.status != celery_states.SUCCESS:
-                failed = True
-                continue
-            transcriptions.append((transcription, offset))
-            progress.steps["transcription"].progress += duration / total_duration
-            self.update_state(state="STARTED", meta=progress.toDict())
+        _collect_transcriptions(
+            self,
+            transJobIds,
+            chunkHashes,
+            chunkIndexes,
+            file_name,
+            progress,
+            total_duration,
+            transcription_result,
+            task_info,
+            config,
+        )
         logging.info(f"Transcription task complete")
         progress.steps["transcription"].state = StepState.DONE
 
         self.update_state(state="STARTED", meta=progress.toDict())
 
-        if failed:
-            raise Exception("Transcription has failed: {}".format(transcription))
-
         # Merge Transcription results
-        if task_info["timestamps"]:
-            transcription_result = TranscriptionResult(
-                transcriptions, [x["spk_id"] for x in task_info["timestamps"]]
-            )
-        else:
-            transcription_result = TranscriptionResult(transcriptions)
-
-        # Save transcription in DB
-        try:
-            db_client.push_transcription(task_info["hash"], transcription_result.words)
-        except Exception as e:
-            logging.warning("Failed to push transcription to DB: {}".format(e))
+        _merge_transcriptions(transcription_result, task_info, config, self.request.id)
 
     # Diarization result
     if config.diarizationConfig.isEnabled:
@@ -275,15 +352,309 @@ def transcription_task(self, task_info: dict, file_path: str):
         self.update_state(state="STARTED", meta=progress.toDict())
         transcription_result.setProcessedSegment(punctuated_text)
 
+    return _save_result(
+        self, self.request.id, task_info, config, progress, transcription_result, file_name
+    )
+
+
+def _result_key(task_info: dict, config: TranscriptionConfig) -> str:
+    """Returns the key identifying requests with the same final result: audio hash, timestamps and
+    canonical configuration, including resolved service names."""
+    request = {
+        "hash": task_info["hash"],
+        "service_name": task_info["service_name"],
+        "timestamps": task_info["timestamps"],
+        "transcription_config": config.toJson(),
+    }
+    return hashlib.sha256(json.dumps(request, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _pcm_hash(file_name: str, config: TranscriptionConfig, timestamps: list = None) -> str:
+    """Returns the key identifying transcriptions of the same transcoded audio: fingerprint of the samples
+    and timestamps, or VAD configuration if there are none, which decide the chunks sent to STT (as
+    task_info["hash"] does for the upload)."""
+    request = {"pcm_fingerprint": pcmFingerprint(file_name)}
+    if timestamps:
+        request["timestamps"] = timestamps
+    else:
+        request["vad_config"] = config.vadConfig.toJson()
+    return hashlib.sha256(json.dumps(request, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _fetch_cached_result_id(result_key: str) -> str:
+    """Returns the result_id of a previous identical request, or None"""
+    if result_key is None:
+        return None
+    try:
+        return db_client.fetch_cached_result_id(result_key)
+    except Exception as e:
+        logging.warning("Failed to fetch cached result: {}".format(str(e)))
+        return None
+
+
+def _fetch_chunk_transcriptions(chunk_hashes: list) -> dict:
+    """Returns the available transcriptions of the given chunks as {chunk_hash: transcription}"""
+    chunk_hashes = [chunk_hash for chunk_hash in chunk_hashes if chunk_hash is not None]
+    if not chunk_hashes:
+        return {}
+    try:
+        return db_client.fetch_chunk_transcriptions(chunk_hashes)
+    except Exception as e:
+        logging.warning("Failed to fetch chunk transcriptions: {}".format(str(e)))
+        return {}
+
+
+def _push_chunk_transcriptions(chunk_transcriptions: dict):
+    """Saves the {chunk_hash: transcription} of chunks"""
+    try:
+        db_client.push_chunk_transcriptions(chunk_transcriptions, CHUNK_CACHE_TTL)
+    except Exception as e:
+        logging.warning("Failed to push chunk transcriptions: {}".format(str(e)))
+
+
+def _iter_batches(items: Iterable, max_size: int) -> Iterator[list]:
+    """Yields consecutive batches of items of 1, 2, 4... up to max_size items: the first items are not
+    delayed until max_size items are available"""
+    batch = []
+    batch_size = 1
+    for item in items:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+            batch_size = min(2 * batch_size, max_size)
+    if batch:
+        yield batch
+
+
+def _stt_concurrency(service_name: str) -> int:
+    """Returns the number of chunks the STT service can transcribe at once, 0 if unknown"""
+    if STT_CONCURRENCY:
+        return STT_CONCURRENCY
+    try:
+        return queue_concurrency(service_name)
+    except Exception as e:
+        logging.warning("Failed to fetch STT concurrency: {}".format(str(e)))
+        return 0
+
+
+def _split_audio(
+    file_name: str, config: TranscriptionConfig, timestamps: list, stt_concurrency: int = 0
+) -> Iterator[Tuple[str, float, float]]:
+    """Split the transcoded file according to the request configuration.
+
+    If stt_concurrency is set, VAD segments are merged into about stt_concurrency chunks of equal duration,
+    within the minimum and maximum segment durations.
+
+    Yields:
+        Tuple[str, float, float]: (subfile_path, offset, duration)
+    """
+    if timestamps:
+        logging.info(f"Split using provided timestamps ...")
+        subfiles, _ = splitUsingTimestamps(
+            file_name, timestamps, write_subfiles=not CHUNK_REFERENCES
+        )
+        yield from subfiles
+    elif not config.vadConfig.isEnabled and config.vadConfig.windowDuration:
+        logging.info(
+            f"Split in windows of {config.vadConfig.windowDuration}s (VAD disabled, overlap={config.vadConfig.windowOverlap}s)"
+        )
+        yield from iterSplitWindows(
+            file_name,
+            config.vadConfig.windowDuration,
+            config.vadConfig.windowOverlap,
+            write_subfiles=not CHUNK_REFERENCES,
+        )
+    elif not config.vadConfig.isEnabled:
+        logging.info(f"Split in one chunk (VAD disabled)")
+        yield (file_name, 0.0, getDuration(file_name))
+    else:
+        logging.info(f"Splitting using VAD ...")
+        if config.vadConfig.minDuration:
+            # Values for ASR like Whisper which pad small segments anyway
+            kwargs = {
+                "min_segment_duration": config.vadConfig.minDuration,
+                "max_segment_duration": config.vadConfig.maxDuration,
+                "min_length": config.vadConfig.minDuration,
+                # "min_silence": 0.6,
+            }
+        else:
+            # Historical values for Kaldi
+            kwargs = {
+                "min_segment_duration": None,
+                "max_segment_duration": 1200.0, # New, to avoid memory errors
+                "min_length": 10,
+                # "min_silence": 0.6,
+            }
+        if stt_concurrency:
+            target_duration = getDuration(file_name) / stt_concurrency
+            if kwargs["max_segment_duration"]:
+                target_duration = min(target_duration, kwargs["max_segment_duration"])
+            if kwargs["min_segment_duration"]:
+                target_duration = max(target_duration, kwargs["min_segment_duration"])
+            logging.info(f"Planning chunks of {round(target_duration, 2)}s for {stt_concurrency} STT workers")
+            kwargs["target_segment_duration"] = target_duration
+        yield from iterSplitFile(
+            file_name,
+            method=config.vadConfig.methodName,
+            write_subfiles=not CHUNK_REFERENCES,
+            **kwargs,
+        )
+
+
+def _transcribe_kwargs(offset: float, duration: float, sample_rate: int) -> dict:
+    """Returns transcribe_task keyword arguments.
+
+    When CHUNK_REFERENCES is set no subfile is written: chunks are sent as the [start_sample, end_sample[
+    range of the transcoded file, to be read directly by the STT worker.
+    """
+    if not CHUNK_REFERENCES:
+        return {}
+    start_sample, end_sample = chunkSampleRange(offset, duration, sample_rate)
+    return {"start_sample": start_sample, "end_sample": end_sample}
+
+
+def _log_split(subfiles: list) -> dict:
+    """Logs and returns the subfile duration statistics"""
+    stats_duration = durationStats(subfiles)
+    logging.info(f"Split in {len(subfiles)} chunks ({', '.join([k+'='+str(round(v, 2)) for k,v in stats_duration.items()])})")
+    return stats_duration
+
+
+def _collect_transcriptions(
+    task,
+    transJobIds: list,
+    chunk_hashes: list,
+    chunk_indexes: list,
+    file_name: str,
+    progress: TaskProgression,
+    total_duration: float,
+    transcription_result: TranscriptionResult,
+    task_info: dict,
+    config: TranscriptionConfig,
+):
+    """Adds the chunk transcriptions to transcription_result as they complete.
+
+    Progress is updated and subfiles are removed as soon as a chunk returns. Every CHECKPOINT_INTERVAL seconds,
+    the completed chunks are saved in the chunk cache and the words transcribed so far are checkpointed.
+    On the first failure, pending chunks are revoked, every completed chunk is saved in the chunk cache so that
+    a new submission only transcribes the missing ones, and an exception is raised.
+    """
+    if not transJobIds:
+        return
+    chunks = {
+        jobId.id: (offset, duration, subfile_path, chunk_hash, index)
+        for (jobId, offset, duration, subfile_path), chunk_hash, index in zip(
+            transJobIds, chunk_hashes, chunk_indexes
+        )
+    }
+    pending_chunks = {}  # Completed chunks not saved in the chunk cache yet: {chunk_hash: transcription}
+    collected = set()  # Ids of the jobs whose result was added
+    last_checkpoint = time.time()
+
+    def on_result(job_id: str, transcription: dict):
+        nonlocal last_checkpoint
+        offset, duration, subfile_path, chunk_hash, index = chunks[job_id]
+        collected.add(job_id)
+        if subfile_path != file_name and os.path.exists(subfile_path):
+            os.remove(subfile_path)
+        transcription_result.addTranscription(transcription, offset, index)
+        if chunk_hash is not None:
+            pending_chunks[chunk_hash] = transcription
+        progress.steps["transcription"].progress += duration / total_duration
+        task.update_state(state="STARTED", meta=progress.toDict())
+        if CHECKPOINT_INTERVAL and time.time() - last_checkpoint >= CHECKPOINT_INTERVAL:
+            _push_chunk_transcriptions(pending_chunks)
+            pending_chunks.clear()
+            _checkpoint_transcription(task.request.id, task_info, config, transcription_result, progress)
+            last_checkpoint = time.time()
+
+    try:
+        ResultSet([jobId for jobId, _, _, _ in transJobIds]).join_native(
+            callback=on_result, disable_sync_subtasks=False
+        )
+    except Exception as error:
+        for jobId, _, _, subfile_path in transJobIds:
+            if not jobId.ready():
+                jobId.revoke()
+            elif jobId.id not in collected and jobId.successful():
+                # Completed while the failure was being raised
+                chunk_hash = chunks[jobId.id][3]
+                if chunk_hash is not None:
+                    pending_chunks[chunk_hash] = jobId.result
+            if subfile_path != file_name and os.path.exists(subfile_path):
+                os.remove(subfile_path)
+        _push_chunk_transcriptions(pending_chunks)
+        raise Exception("Transcription has failed: {}".format(error))
+    _push_chunk_transcriptions(pending_chunks)
+
+
+def _chunk_overlap(config: TranscriptionConfig) -> float:
+    """Returns the duration over which consecutive chunks overlap"""
+    if not config.vadConfig.isEnabled and config.vadConfig.windowDuration:
+        return config.vadConfig.windowOverlap
+    return 0.0
+
+
+def _checkpoint_transcription(
+    job_id: str,
+    task_info: dict,
+    config: TranscriptionConfig,
+    transcription_result: TranscriptionResult,
+    progress: TaskProgression,
+):
+    """Saves the words transcribed so far by the job"""
+    try:
+        db_client.push_partial_transcription(
+            job_id,
+            task_info["hash"],
+            transcription_result.partial_words(_chunk_overlap(config)),
+            progress.steps["transcription"].progress,
+            PARTIAL_TRANSCRIPTION_TTL,
+        )
+    except Exception as e:
+        logging.warning("Failed to push partial transcription to DB: {}".format(e))
+
+
+def _merge_transcriptions(
+    transcription_result: TranscriptionResult, task_info: dict, config: TranscriptionConfig, job_id: str
+):
+    """Merges the chunk transcriptions added to transcription_result and saves the transcription in DB"""
+    if task_info["timestamps"]:
+        transcription_result.mergeTranscriptions([x["spk_id"] for x in task_info["timestamps"]])
+    else:
+        transcription_result.mergeTranscriptions(overlap=_chunk_overlap(config))
+
+    # Save transcription in DB
+    try:
+        db_client.push_transcription(
+            task_info["hash"], transcription_result.words, task_info.get("pcm_hash")
+        )
+        if CHECKPOINT_INTERVAL:
+            db_client.delete_partial_transcription(job_id)
+    except Exception as e:
+        logging.warning("Failed to push transcription to DB: {}".format(e))
+
+
+def _save_result(
+    task,
+    job_id: str,
+    task_info: dict,
+    config: TranscriptionConfig,
+    progress: TaskProgression,
+    transcription_result: TranscriptionResult,
+    file_name: str,
+) -> str:
+    """Writes the final result in database, frees the audio file and returns the result_id"""
     logging.info(f"Task complete, post processing ...")
 
     # Write result in database
     progress.steps["postprocessing"].state = StepState.STARTED
-    self.update_state(state="STARTED", meta=progress.toDict())
+    task.update_state(state="STARTED", meta=progress.toDict())
     try:
         result_id = db_client.push_result(
             file_hash=task_info["hash"],
-            job_id=self.request.id,
+            job_id=job_id,
             origin="origin",
             service_name=task_info["service_name"],
             config=config,
@@ -291,6 +662,11 @@ def transcription_task(self, task_info: dict, file_path: str):
         )
     except Exception as e:
         raise Exception("Failed to process result")
+    if task_info.get("result_key"):
+        try:
+            db_client.push_cached_result_id(task_info["result_key"], result_id, RESULT_CACHE_TTL)
+        except Exception as e:
+            logging.warning("Failed to cache result: {}".format(str(e)))
 
     # Free ressource
     if not task_info["keep_audio"]:
@@ -302,20 +678,235 @@ def transcription_task(self, task_info: dict, file_path: str):
     return result_id
 
 
+def _event_workflow(
+    task_info: dict,
+    config: TranscriptionConfig,
+    progress: TaskProgression,
+    file_name: str,
+    subfiles: list,
+):
+    """Builds the canvas replacing transcription_task in event orchestration mode.
+
+    Transcription chunks and diarization are dispatched as the header of a chord whose body,
+    transcription_merge_task, runs on the request workers once every result is available.
+    subfiles is None when the transcription is already available in DB.
+    """
+    request_queue = f"{task_info['service_name']}_requests"
+    header = []
+    chunk_hashes = []
+    chunk_indexes = []  # Position of the dispatched chunks among subfiles
+    cached_transcriptions = []  # [(transcription, offset, index)]
+    if subfiles is not None:
+        progress.steps["transcription"].state = StepState.STARTED
+        chunk_indexes = list(range(len(subfiles)))
+        audio, sample_rate = readWav(file_name)
+        if CHUNK_CACHE_TTL:
+            chunk_hashes = [
+                pcmChunkFingerprint(audio, offset, duration, sample_rate)
+                for _, offset, duration in subfiles
+            ]
+        else:
+            chunk_hashes = [None] * len(subfiles)
+        del audio
+        available = _fetch_chunk_transcriptions(chunk_hashes)
+        if available:
+            logging.info(f"{len(available)} chunks already transcribed")
+            total_duration = durationStats(subfiles)["total"]
+            dispatched = []
+            for index, ((subfile_path, offset, duration), chunk_hash) in enumerate(zip(subfiles, chunk_hashes)):
+                if chunk_hash not in available:
+                    dispatched.append(((subfile_path, offset, duration), chunk_hash, index))
+                    continue
+                if subfile_path != file_name and os.path.exists(subfile_path):
+                    os.remove(subfile_path)
+                cached_transcriptions.append((available[chunk_hash], offset, index))
+                progress.steps["transcription"].progress += duration / total_duration
+            subfiles = [subfile for subfile, _, _ in dispatched]
+            chunk_hashes = [chunk_hash for _, chunk_hash, _ in dispatched]
+            chunk_indexes = [index for _, _, index in dispatched]
+        for (subfile_path, offset, duration), chunk_hash in zip(subfiles, chunk_hashes):
+            transcribe = celery.signature(
+                "transcribe_task",
+                args=[subfile_path, True],
+                kwargs=_transcribe_kwargs(offset, duration, sample_rate),
+                queue=task_info["service_name"],
+            )
+            if chunk_hash is not None:
+                # Saved as soon as the chunk completes, the chord body does not run if another chunk fails
+                transcribe.link(transcription_chunk_cache_task.signature((chunk_hash,), queue=request_queue))
+            header.append(transcribe)
+    if config.diarizationConfig.isEnabled:
+        logging.info(
+            f"Processing diarization task on {config.diarizationConfig.serviceQueue}..."
+        )
+        progress.steps["diarization"].state = StepState.STARTED
+        header.append(
+            celery.signature(
+                config.diarizationConfig.task_name,
+                args=[
+                    file_name,
+                    config.diarizationConfig.numberOfSpeaker,
+                    config.diarizationConfig.maxNumberOfSpeaker,
+                ],
+                queue=config.diarizationConfig.serviceQueue,
+            )
+        )
+
+    context = {
+        "task_info": task_info,
+        "transcription_config": config.toJson(),
+        "diarization": config.diarizationConfig.isEnabled,
+        "punctuation": config.punctuationConfig.isEnabled,
+        "punctuation_queue": config.punctuationConfig.serviceQueue,
+        "progress": progress.toDict(),
+        "file_name": file_name,
+        "subfiles": subfiles,
+        "chunk_indexes": chunk_indexes,
+        "cached_transcriptions": cached_transcriptions,
+    }
+    if not header:
+        return transcription_merge_task.signature(([], context), queue=request_queue)
+
+    workflow = chord(header, transcription_merge_task.signature((context,), queue=request_queue))
+    if subfiles is not None:
+        workflow.link_error(
+            transcription_cleanup_task.signature(
+                kwargs={
+                    "file_paths": [
+                        subfile_path
+                        for subfile_path, _, _ in subfiles
+                        if subfile_path != file_name
+                    ]
+                },
+                queue=request_queue,
+            )
+        )
+    logging.info(f"Dispatched {len(header)} subtasks, releasing request worker")
+    return workflow
+
+
+@celery.task(name="transcription_merge_task", bind=True)
+def transcription_merge_task(self, results: list, context: dict):
+    """Collects the subtask results of an event orchestrated transcription_task.
+
+    results contains the chunk transcriptions in the order of context["subfiles"] followed by the diarization
+    result if diarization is enabled. They are merged with the context["cached_transcriptions"] of chunks
+    that were already transcribed. Chunk transcriptions are saved in the chunk cache by
+    transcription_chunk_cache_task. The task inherits the transcription_task job id.
+    """
+    _setup_logging(self.request.id)
+    task_info = context["task_info"]
+    config = TranscriptionConfig(context["transcription_config"])
+    progress = TaskProgression.fromDict(context["progress"])
+    file_name = context["file_name"]
+
+    if context["diarization"]:
+        speakers = results[-1]
+        results = results[:-1]
+
+    # Transcription result
+    if context["subfiles"] is None:
+        available_transcription = db_client.fetch_transcription(task_info["hash"], task_info["pcm_hash"])
+        if available_transcription is None:
+            raise Exception("Transcription is no longer available for {}".format(task_info["hash"]))
+        transcription_result = TranscriptionResult(None)
+        transcription_result.setTranscription(available_transcription["words"])
+    else:
+        for subfile_path, _, _ in context["subfiles"]:
+            if subfile_path != file_name and os.path.exists(subfile_path):
+                os.remove(subfile_path)
+        logging.info(f"Transcription task complete")
+        transcription_result = TranscriptionResult(None)
+        for transcription, (_, offset, _), index in zip(results, context["subfiles"], context["chunk_indexes"]):
+            transcription_result.addTranscription(transcription, offset, index)
+        for transcription, offset, index in context["cached_transcriptions"]:
+            transcription_result.addTranscription(transcription, offset, index)
+        _merge_transcriptions(transcription_result, task_info, config, self.request.id)
+    progress.steps["transcription"].state = StepState.DONE
+
+    # Diarization result
+    if context["diarization"]:
+        logging.info(f"Diarization task complete")
+        progress.steps["diarization"].state = StepState.DONE
+        transcription_result.setDiarizationResult(speakers)
+    elif not task_info["timestamps"]:
+        transcription_result.setNoDiarization()
+    self.update_state(state="STARTED", meta=progress.toDict())
+
+    # Punctuation
+    if context["punctuation"]:
+        logging.info(f"Processing punctuation task on {context['punctuation_queue']} ...")
+        progress.steps["punctuation"].state = StepState.STARTED
+        self.update_state(state="STARTED", meta=progress.toDict())
+        context["progress"] = progress.toDict()
+        return self.replace(
+            chain(
+                celery.signature(
+                    config.punctuationConfig.task_name,
+                    args=[[seg.toString() for seg in transcription_result.segments]],
+                    queue=context["punctuation_queue"],
+                ),
+                transcription_finalize_task.signature(
+                    (transcription_result.final_result(), context),
+                    queue=f"{task_info['service_name']}_requests",
+                ),
+            )
+        )
+
+    return _save_result(
+        self, self.request.id, task_info, config, progress, transcription_result, file_name
+    )
+
+
+@celery.task(name="transcription_finalize_task", bind=True)
+def transcription_finalize_task(self, punctuated_text, partial_result: dict, context: dict):
+    """Applies the punctuation result of an event orchestrated transcription_task and saves the final result.
+
+    The task inherits the transcription_task job id.
+    """
+    _setup_logging(self.request.id)
+    logging.info(f"Punctuation task complete.")
+    config = TranscriptionConfig(context["transcription_config"])
+    progress = TaskProgression.fromDict(context["progress"])
+    progress.steps["punctuation"].state = StepState.DONE
+    self.update_state(state="STARTED", meta=progress.toDict())
+
+    transcription_result = TranscriptionResult.fromDict(partial_result)
+    transcription_result.setProcessedSegment(punctuated_text)
+
+    return _save_result(
+        self,
+        self.request.id,
+        context["task_info"],
+        config,
+        progress,
+        transcription_result,
+        context["file_name"],
+    )
+
+
+@celery.task(name="transcription_cleanup_task")
+def transcription_cleanup_task(*args, file_paths: list = [], **kwargs):
+    """Errback of event orchestrated transcription_task: removes the remaining subfiles."""
+    for file_path in file_paths:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+
+@celery.task(name="transcription_chunk_cache_task")
+def transcription_chunk_cache_task(transcription: dict, chunk_hash: str):
+    """Callback of the chunk subtasks of an event orchestrated transcription_task: saves the chunk transcription
+    in the chunk cache."""
+    _push_chunk_transcriptions({chunk_hash: transcription})
+
+
 @celery.task(name="transcription_task_multi", bind=True)
 def transcription_task_multi(self, task_info: dict, files_info: list):
     
     # TODO: factorize with transcription_task()
 
     # Logging task
-    logging.basicConfig(
-        filename=f"/usr/src/app/logs/{self.request.id}.txt",
-        filemode="a",
-        format="%(asctime)s,%(levelname)s %(message)s",
-        datefmt="%H:%M:%S",
-        level=logging.DEBUG,
-        force=True,
-    )
+    _setup_logging(self.request.id)
     logging.info(f"Running task {self.request.id}")
 
     self.update_state(state="STARTED", meta={"steps": {}})
@@ -369,8 +960,8 @@ def transcription_task_multi(self, task_info: dict, files_info: list):
         #    continue
 
         # Split file
-        subfiles, stats_duration = splitFile(file_name)
-        total_duration += stats_duration["total"]
+        subfiles, _ = splitFile(file_name)
+        total_duration += getDuration(file_name)
         logging.info(
             "{} splitted into {} subfiles.".format(file_info["filename"], len(subfiles))
         )
@@ -1,6 +1,12 @@
+import functools
+import hashlib
+import itertools
 import os
+import shutil
+import struct
 import subprocess
-from typing import Dict, List, Tuple
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Tuple
 
 import numpy as np
 import wavio
@@ -27,6 +33,16 @@ def transcoding(
         basename = f"{basename}.wav"
     output_file_path = os.path.join(folder, basename)
 
+    # Already in the target format: no need to decode
+    if _isTargetFormat(input_file_path, output_sr, output_channels):
+        if os.path.exists(output_file_path):
+            os.remove(output_file_path)
+        if cleanup:
+            os.rename(input_file_path, output_file_path)
+        else:
+            _linkOrCopy(input_file_path, output_file_path)
+        return output_file_path
+
     # Subprocess
     command = f"ffmpeg -i {input_file_path} -y -acodec pcm_s16le"
     if output_channels is not None:
@@ -47,16 +63,205 @@ def transcoding(
     return output_file_path
 
 
-def getDuration(file_path):
-    content = wavio.read(file_path)
-    num_samples = content.data.shape[0]
-    return num_samples / content.rate
+def _isTargetFormat(file_path: str, sample_rate: int, channels: int) -> bool:
+    """Returns True if file_path is a 16b PCM WAV file at sample_rate with channels channels, which header
+    declares the size of the samples it contains. Other readers rely on the declared size: streamed files
+    with an unknown or truncated data size must be rewritten."""
+    try:
+        header = readWavHeader(file_path)
+    except (ValueError, struct.error):
+        return False
+    return (
+        header.audio_format == _WAVE_FORMAT_PCM
+        and header.sample_width == 2
+        and header.sample_rate == sample_rate
+        and (channels is None or header.channels == channels)
+        and header.num_samples > 0
+        and header.is_complete
+    )
+
+
+def _linkOrCopy(src: str, dst: str):
+    """Hard-link src to dst, or copy it if the file system does not support links"""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+@dataclass
+class WavHeader:
+    """RIFF/WAVE header informations"""
+
+    audio_format: int
+    channels: int
+    sample_rate: int
+    sample_width: int
+    data_offset: int
+    data_size: int
+    declared_data_size: int  # Size of the data chunk in the header, 0 or 0xFFFFFFFF if unknown
+
+    @property
+    def num_samples(self) -> int:
+        return self.data_size // (self.sample_width * self.channels)
+
+    @property
+    def is_complete(self) -> bool:
+        """True if the declared data size is known and matches the samples available in the file"""
+        return (
+            self.declared_data_size == self.data_size
+            and self.declared_data_size not in (0, 0xFFFFFFFF)
+            and self.data_size % (self.sample_width * self.channels) == 0
+        )
+
+
+_WAVE_FORMAT_PCM = 0x0001
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def readWavHeader(file_path: str) -> WavHeader:
+    """Parse the RIFF header of a WAV file without reading the samples
+
+    Raises:
+        ValueError: The file is not a RIFF/WAVE file
+    """
+    file_size = os.path.getsize(file_path)
+    with open(file_path, "rb") as f:
+        riff_header = f.read(12)
+        if len(riff_header) < 12 or riff_header[:4] != b"RIFF" or riff_header[8:] != b"WAVE":
+            raise ValueError(f"{file_path} is not a RIFF/WAVE file")
+        fmt = None
+        while True:
+            chunk_header = f.read(8)
+            if len(chunk_header) < 8:
+                raise ValueError(f"No data chunk found in {file_path}")
+            chunk_id, chunk_size = struct.unpack("<4sI", chunk_header)
+            if chunk_id == b"fmt ":
+                fmt = struct.unpack("<HHIIHH", f.read(16))
+                f.seek(chunk_size - 16 + chunk_size % 2, os.SEEK_CUR)
+            elif chunk_id == b"data":
+                if fmt is None:
+                    raise ValueError(f"No fmt chunk found before data in {file_path}")
+                audio_format, channels, sample_rate, _, _, bits_per_sample = fmt
+                data_offset = f.tell()
+                # Streamed files may declare an unknown data size
+                available = file_size - data_offset
+                data_size = available if chunk_size in (0, 0xFFFFFFFF) else min(chunk_size, available)
+                return WavHeader(
+                    audio_format=audio_format,
+                    channels=channels,
+                    sample_rate=sample_rate,
+                    sample_width=bits_per_sample // 8,
+                    data_offset=data_offset,
+                    data_size=data_size,
+                    declared_data_size=chunk_size,
+                )
+            else:
+                f.seek(chunk_size + chunk_size % 2, os.SEEK_CUR)
+
+
+def readWav(file_path: str) -> Tuple[np.ndarray, int]:
+    """Memory-map the samples of a PCM WAV file. Samples are read from disk when they are accessed.
+
+    Returns:
+        Tuple[np.ndarray, int]: (samples, sample_rate) with samples of shape (num_samples,) for mono files
+        and (num_samples, channels) otherwise.
+    """
+    header = readWavHeader(file_path)
+    if header.audio_format not in (_WAVE_FORMAT_PCM, _WAVE_FORMAT_EXTENSIBLE):
+        raise ValueError(f"Unsupported WAV format {header.audio_format} for {file_path}")
+    dtypes = {1: np.uint8, 2: np.dtype("<i2"), 4: np.dtype("<i4")}
+    if header.sample_width not in dtypes:
+        raise ValueError(f"Unsupported WAV sample width {header.sample_width} for {file_path}")
+    if header.num_samples == 0:
+        return np.zeros((0,), dtype=dtypes[header.sample_width]), header.sample_rate
+    audio = np.memmap(
+        file_path,
+        dtype=dtypes[header.sample_width],
+        mode="r",
+        offset=header.data_offset,
+        shape=(header.num_samples, header.channels),
+    )
+    return (audio[:, 0] if header.channels == 1 else audio), header.sample_rate
+
+
+def pcmFingerprint(file_path: str, block_size: int = 1 << 20) -> str:
+    """Returns a sha256 hex digest of the samples and format of a WAV file.
+
+    Unlike a hash of the file, it does not depend on the container metadata, so that the same audio
+    transcoded from different uploads has the same fingerprint.
+    """
+    header = readWavHeader(file_path)
+    digest = hashlib.sha256(
+        struct.pack("<HII", header.channels, header.sample_rate, header.sample_width)
+    )
+    with open(file_path, "rb") as f:
+        f.seek(header.data_offset)
+        remaining = header.data_size
+        while remaining > 0:
+            block = f.read(min(block_size, remaining))
+            if not block:
+                break
+            digest.update(block)
+            remaining -= len(block)
+    return digest.hexdigest()
+
+
+def pcmChunkFingerprint(audio: np.ndarray, offset: float, duration: float, sample_rate: int) -> str:
+    """Returns a sha256 hex digest of the samples of a chunk (subfile_path, offset, duration) of audio"""
+    start, end = chunkSampleRange(offset, duration, sample_rate)
+    digest = hashlib.sha256(struct.pack("<I", sample_rate))
+    digest.update(np.ascontiguousarray(audio[start:end]).data)
+    return digest.hexdigest()
+
+
+def getDuration(file_path: str) -> float:
+    """Returns the duration of an audio file in seconds.
+
+    Only the RIFF header is read for WAV files, other formats are probed using ffprobe.
+    """
+    try:
+        header = readWavHeader(file_path)
+    except ValueError:
+        return _probeDuration(file_path)
+    return header.num_samples / header.sample_rate
+
+
+def _probeDuration(file_path: str) -> float:
+    """Returns the container duration reported by ffprobe"""
+    if not os.path.isfile(file_path):
+        raise FileNotFoundError(f"Ressource not found: {file_path}")
+    command = [
+        "ffprobe",
+        "-v",
+        "error",
+        "-show_entries",
+        "format=duration",
+        "-of",
+        "default=noprint_wrappers=1:nokey=1",
+        file_path,
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stdout, stderr = process.communicate()
+    try:
+        return float(stdout.decode("utf-8").strip())
+    except ValueError:
+        stderr = stderr.decode("utf-8")
+        raise Exception(f"Failed to probe duration (command: {' '.join(command)}):\n{stderr}")
+
 
+VAD_BLOCK_FRAMES = 2000  # Number of VAD frames analysed at once
 
 _vad_methods = [
-    "WebRTC"
+    "WebRTC",
+    "Energy",
 ]
 
+# Energy VAD: minimum frame energy (dBFS) of speech for each aggressiveness mode
+ENERGY_VAD_THRESHOLDS = [-55.0, -48.0, -42.0, -36.0]
+ENERGY_VAD_MAX_ZCR = 0.35  # Frames crossing zero more often are noise-like, unless they are loud
+ENERGY_VAD_LOUD_MARGIN = 15.0  # dB above the threshold from which frames are speech whatever their zero crossing rate
+
 def validate_vad_method(method):
     _method = None
     for m in _vad_methods:
@@ -77,54 +282,181 @@ def vadCutIndexes(
     method: str = "WebRTC",
 ):
     """Apply VAD on the signal and returns cut indexes located between speech segments"""
+    return list(
+        iterVadCutIndexes(
+            audio,
+            sample_rate,
+            chunk_length=chunk_length,
+            mode=mode,
+            min_silence=min_silence,
+            max_segment_duration=max_segment_duration,
+            method=method,
+        )
+    )
+
+
+def iterVadCutIndexes(
+    audio,
+    sample_rate,
+    chunk_length: float = 0.03,
+    mode: int = 1,
+    min_silence: float = 0.6,
+    max_segment_duration: float = None,
+    method: str = "WebRTC",
+) -> Iterator[int]:
+    """Apply VAD on the signal and yields cut indexes located between speech segments as soon as they are decided"""
     min_silence_frame = min_silence / chunk_length
     max_speech_frame = max_segment_duration / chunk_length if max_segment_duration else None
 
     method = validate_vad_method(method)
 
-    if method == "WebRTC":
-        vad = webrtcvad.Vad()
-        vad.set_mode(mode)
-    else:
-        raise NotImplementedError(f"VAD method with {method}")
-
     chunk_size = int(sample_rate * chunk_length)
-    vad_res = []
-
-    # Split in chunk size and process VAD
-    for start in range(0, len(audio) - chunk_size, chunk_size):
-        buffer = (audio[start : start + chunk_size]).astype(np.int16).tobytes()
-        vad_res.append(vad.is_speech(buffer, sample_rate))
+    num_frames = len(range(0, len(audio) - chunk_size, chunk_size))
 
     # Determines cut indexes in the middle of silence windows
     # Ignore silence windows which length are < min_silence_frame
-    was_speech = vad_res[0]
+    # The state is carried over from one block of frames to the next
+    was_speech = None
     sil_start_i = 0
     speech_start_i = 0
     previous_candidate = None
-    cut_indexes = []
 
-    for i, is_speech in enumerate(vad_res):
-        if is_speech and not was_speech:  # Start of speech
-            candidate = int(np.mean([sil_start_i, i]))
-            is_silence_long = (i - sil_start_i > min_silence_frame)
+    for block_start, vad_res in _iterVadMasks(audio, sample_rate, chunk_size, num_frames, method, mode):
+        if was_speech is None:
+            was_speech = vad_res[0]
+
+        # Run-length encoding of the mask: frames where speech or silence starts
+        previous = np.concatenate(([was_speech], vad_res[:-1]))
+        transitions = np.flatnonzero(vad_res != previous)
+        speech_starts = transitions[vad_res[transitions]] + block_start
+        sil_starts = transitions[~vad_res[transitions]] + block_start
+
+        # Silence start preceding each speech start (possibly in a previous block)
+        speech_sil_starts = np.concatenate(([sil_start_i], sil_starts))[
+            np.searchsorted(sil_starts, speech_starts)
+        ]
+        candidates = (speech_sil_starts + speech_starts) // 2
+        silence_long = speech_starts - speech_sil_starts > min_silence_frame
+
+        for i, candidate, is_silence_long in zip(
+            speech_starts.tolist(), candidates.tolist(), silence_long.tolist()
+        ):
             is_speech_long = (max_speech_frame and (i - speech_start_i > max_speech_frame))
             if is_silence_long or is_speech_long:
                 if is_speech_long and previous_candidate:
                     candidate = previous_candidate
-                cut_indexes.append(candidate)
+                yield candidate * chunk_size
                 speech_start_i = candidate
                 previous_candidate = None
             else:
                 previous_candidate = candidate
-            was_speech = True
 
-        elif not is_speech and was_speech:  # Start of silence
-            was_speech = False
-            sil_start_i = i
+        if len(sil_starts):
+            sil_start_i = int(sil_starts[-1])
+        was_speech = vad_res[-1]
 
-    # Returns cut_indexes as list
-    return (np.array(cut_indexes) * chunk_size).astype(np.int32).tolist()
+
+def _vadMasker(method: str, sample_rate: int, chunk_size: int, mode: int) -> Callable[[np.ndarray], np.ndarray]:
+    """Returns a function computing the speech mask of consecutive chunk_size frames of the successive blocks of a signal"""
+    if method == "WebRTC":
+        vad = webrtcvad.Vad()
+        vad.set_mode(mode)
+        return functools.partial(_webrtcMask, vad, sample_rate=sample_rate, chunk_size=chunk_size)
+    if method == "Energy":
+        return functools.partial(_energyMask, chunk_size=chunk_size, mode=mode)
+    raise NotImplementedError(f"VAD method with {method}")
+
+
+def _iterVadMasks(
+    audio, sample_rate: int, chunk_size: int, num_frames: int, method: str, mode: int
+) -> Iterator[Tuple[int, np.ndarray]]:
+    """Yields (first_frame, speech_mask) of consecutive blocks of VAD_BLOCK_FRAMES frames covering the num_frames
+    first frames"""
+    masker = _vadMasker(method, sample_rate, chunk_size, mode)
+    for block_start in range(0, num_frames, VAD_BLOCK_FRAMES):
+        block_stop = min(num_frames, block_start + VAD_BLOCK_FRAMES)
+        yield block_start, masker(audio[block_start * chunk_size : block_stop * chunk_size])
+
+
+def _webrtcMask(vad: webrtcvad.Vad, audio, sample_rate: int, chunk_size: int) -> np.ndarray:
+    """Returns the WebRTC speech mask of consecutive chunk_size frames"""
+    frames = np.ascontiguousarray(audio, dtype=np.int16)
+    buffer = memoryview(frames).cast("B")
+    frame_bytes = chunk_size * frames.itemsize
+    return np.fromiter(
+        (
+            vad.is_speech(buffer[start : start + frame_bytes], sample_rate)
+            for start in range(0, len(buffer) - frame_bytes + 1, frame_bytes)
+        ),
+        dtype=bool,
+    )
+
+
+def _energyMask(audio, chunk_size: int, mode: int) -> np.ndarray:
+    """Returns the speech mask of consecutive chunk_size frames of 16b PCM based on frame energy and zero crossing rate"""
+    num_frames = len(audio) // chunk_size
+    frames = np.asarray(audio[: num_frames * chunk_size], dtype=np.float32).reshape(num_frames, chunk_size)
+    frames /= 32768.0
+    energy = 10 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+    signs = np.signbit(frames)
+    zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / (chunk_size - 1)
+    threshold = ENERGY_VAD_THRESHOLDS[mode]
+    return (energy > threshold) & ((zcr < ENERGY_VAD_MAX_ZCR) | (energy > threshold + ENERGY_VAD_LOUD_MARGIN))
+
+
+def _filterCutIndexes(
+    cut_indexes: Iterator[int],
+    min_segment_samples: float,
+    around_min_segment_duration: bool = False,
+) -> Iterator[int]:
+    """Drop cut indexes producing segments shorter than min_segment_samples"""
+    start = 0
+    stop_candidate = None
+    for stop in cut_indexes:
+        if stop - start > min_segment_samples:
+            if around_min_segment_duration and stop_candidate is not None:
+                yield stop_candidate
+                start = stop_candidate
+                stop_candidate = None
+                if stop - start < min_segment_samples:
+                    continue
+            yield stop
+            start = stop
+            stop_candidate = None
+        else:
+            stop_candidate = stop
+
+
+def _balanceCutIndexes(
+    cut_indexes: Iterator[int],
+    target_segment_samples: float,
+    num_samples: int,
+    max_segment_samples: float = None,
+) -> Iterator[int]:
+    """Merge consecutive segments into segments as close as possible to target_segment_samples.
+
+    Each time a segment reaches the target, the segment is cut at the cut index, or at the previous one
+    if it is closer to the target or if the segment would be longer than max_segment_samples.
+    """
+    start = 0
+    previous = None
+    for stop in itertools.chain(cut_indexes, [num_samples]):
+        if stop - start < target_segment_samples:
+            previous = stop
+            continue
+        too_long = max_segment_samples and stop - start > max_segment_samples
+        if previous is not None and (
+            too_long
+            or target_segment_samples - (previous - start) < (stop - start) - target_segment_samples
+        ):
+            yield previous
+            start = previous
+        if stop < num_samples and stop - start >= target_segment_samples:
+            yield stop
+            start = stop
+            previous = None
+        else:
+            previous = stop
 
 
 def splitFile(
@@ -135,17 +467,56 @@ def splitFile(
     max_segment_duration: float = None,
     min_silence: float = 0.6,
     around_min_segment_duration: bool = False,
+    write_subfiles: bool = True,
+    target_segment_duration: float = None,
     ) -> Tuple[List[Tuple[str, float, float]], float]:
     """
     Split a file into multiple subfiles using vad
     
     Args:
         file_path (str): Audiofile
-        method (str): VAD method [WebRTC]
+        method (str): VAD method [WebRTC, Energy]
         min_length (float): Minimum length of the file in seconds to apply the VAD
         min_segment_duration (float): Minimum duration of a segment in seconds
         min_silence (float): Minimum duration of silence in seconds
         around_min_segment_duration (bool): If True, segments can be kept just before they reach min_segment_duration
+        write_subfiles (bool): If False, no subfile is written and chunks reference file_path (see chunkSampleRange)
+        target_segment_duration (float): If set, consecutive segments are merged into segments of about target_segment_duration seconds
+    """
+    return _with_stat_durations(
+        list(
+            iterSplitFile(
+                file_path,
+                method=method,
+                min_length=min_length,
+                min_segment_duration=min_segment_duration,
+                max_segment_duration=max_segment_duration,
+                min_silence=min_silence,
+                around_min_segment_duration=around_min_segment_duration,
+                write_subfiles=write_subfiles,
+                target_segment_duration=target_segment_duration,
+            )
+        )
+    )
+
+
+def iterSplitFile(
+    file_path,
+    method: str = "WebRTC",
+    min_length: float = 10,
+    min_segment_duration: float = None,
+    max_segment_duration: float = None,
+    min_silence: float = 0.6,
+    around_min_segment_duration: bool = False,
+    write_subfiles: bool = True,
+    target_segment_duration: float = None,
+    ) -> Iterator[Tuple[str, float, float]]:
+    """
+    Split a file into multiple subfiles using vad, yielding each subfile as soon as its cut is final.
+    Same arguments as splitFile.
+
+    Yields:
+        Tuple[str, float, float]: (subfile_path, offset, duration)
     """
 
     if min_segment_duration and max_segment_duration:
@@ -154,57 +525,88 @@ def splitFile(
 
     # TODO: factorize with splitUsingTimestamps
 
-    content = wavio.read(file_path)
-    sr = content.rate
-    audio = np.squeeze(content.data)
+    audio, sr = readWav(file_path)
 
     # Do not split file under min_length
     if len(audio) / sr < min_length:
-        return _with_stat_durations([(file_path, 0.0, len(audio) / sr)])
+        yield (file_path, 0.0, len(audio) / sr)
+        return
 
     # Get cut indexes based on vad
-    cut_indexes = vadCutIndexes(audio, sr, method=method, min_silence=min_silence, max_segment_duration=max_segment_duration)
+    cut_indexes = iterVadCutIndexes(audio, sr, method=method, min_silence=min_silence, max_segment_duration=max_segment_duration)
 
     # TODO: use "min_segment_duration" in vadCutIndexes()
     if min_segment_duration:
-        min_segment_samples = min_segment_duration * sr
-        new_cut_indexes = []
-        start = 0
-        stop_candidate = None
-        for stop in cut_indexes:
-            if stop - start > min_segment_samples:
-                if around_min_segment_duration and stop_candidate is not None:
-                    new_cut_indexes.append(stop_candidate)
-                    start = stop_candidate
-                    stop_candidate = None
-                    if stop - start < min_segment_samples:
-                        continue
-                new_cut_indexes.append(stop)
-                start = stop
-                stop_candidate = None
-            else:
-                stop_candidate = stop
-        cut_indexes = new_cut_indexes
+        cut_indexes = _filterCutIndexes(cut_indexes, min_segment_duration * sr, around_min_segment_duration)
+    if target_segment_duration:
+        cut_indexes = _balanceCutIndexes(
+            cut_indexes,
+            target_segment_duration * sr,
+            len(audio),
+            max_segment_duration * sr if max_segment_duration else None,
+        )
 
-    # If no cut detected
-    if len(cut_indexes) == 0:
-        return _with_stat_durations([(file_path, 0.0, len(audio) / sr)])
     basename = os.path.splitext(file_path)[0]
 
     # Create subfiles
-    subfiles = []
     i = 0
-    for start, stop in zip([0] + cut_indexes, cut_indexes + [len(audio)]):
-        subfile_path = f"{basename}_{i}.wav"
-        offset = start / sr
-        wavio.write(subfile_path, audio[start:stop], sr)
-        duration = (stop - start) / sr
-        subfiles.append((subfile_path, offset, duration))
+    start = 0
+    for stop in cut_indexes:
+        yield _subfile(file_path, f"{basename}_{i}.wav", audio, start, stop, sr, write_subfiles)
+        start = stop
         i += 1
 
-    return _with_stat_durations(subfiles)
+    # If no cut detected
+    if i == 0:
+        yield (file_path, 0.0, len(audio) / sr)
+    else:
+        yield _subfile(file_path, f"{basename}_{i}.wav", audio, start, len(audio), sr, write_subfiles)
+
+
+def iterSplitWindows(
+    file_path: str,
+    window_duration: float,
+    overlap: float = 0.0,
+    write_subfiles: bool = True,
+) -> Iterator[Tuple[str, float, float]]:
+    """Split a file into windows of window_duration seconds, each window overlapping the next one over overlap seconds.
+
+    Yields:
+        Tuple[str, float, float]: (subfile_path, offset, duration)
+    """
+    audio, sr = readWav(file_path)
+    if len(audio) <= window_duration * sr:
+        yield (file_path, 0.0, len(audio) / sr)
+        return
+    basename = os.path.splitext(file_path)[0]
+    window = int(window_duration * sr)
+    step = window - int(overlap * sr)
+    for i, start in enumerate(range(0, len(audio) - int(overlap * sr), step)):
+        yield _subfile(file_path, f"{basename}_{i}.wav", audio, start, min(start + window, len(audio)), sr, write_subfiles)
+
+
+def _subfile(
+    file_path: str, subfile_path: str, audio, start: int, stop: int, sr: int, write_subfile: bool
+) -> Tuple[str, float, float]:
+    """Write the [start:stop] samples in subfile_path or returns a reference to file_path"""
+    if not write_subfile:
+        return (file_path, start / sr, (stop - start) / sr)
+    wavio.write(subfile_path, audio[start:stop], sr)
+    return (subfile_path, start / sr, (stop - start) / sr)
+
+
+def chunkSampleRange(offset: float, duration: float, sample_rate: int) -> Tuple[int, int]:
+    """Returns the (start_sample, end_sample) range in the source file of a chunk (subfile_path, offset, duration)
+    yielded with write_subfiles=False."""
+    return round(offset * sample_rate), round((offset + duration) * sample_rate)
+
 
 def _with_stat_durations(subfiles):
+    return subfiles, durationStats(subfiles)
+
+
+def durationStats(subfiles: List[Tuple[str, float, float]]) -> Dict[str, float]:
+    """Returns total, mean, min and max duration of the subfiles"""
     total_duration = 0.0
     min_duration = float("inf")
     max_duration = 0.0
@@ -212,7 +614,7 @@ def _with_stat_durations(subfiles):
         total_duration += duration
         min_duration = min(min_duration, duration)
         max_duration = max(max_duration, duration)
-    return subfiles, {
+    return {
         "total": total_duration,
         "mean": total_duration / len(subfiles),
         "min": min_duration,
@@ -220,32 +622,34 @@ def _with_stat_durations(subfiles):
     }
 
 def splitUsingTimestamps(
-    file_path: str, timestamps: List[Dict]
+    file_path: str, timestamps: List[Dict], write_subfiles: bool = True
 ) -> Tuple[List[Tuple[str, float, float]], float]:
     """Split using a list of timestamps
 
     Args:
         file_path (str): Audiofile
         timestamps (List[Dict]): A list of timesample {"start": float, "end": float, "id": any}
+        write_subfiles (bool): If False, no subfile is written and chunks reference file_path (see chunkSampleRange)
 
     Returns:
         Tuple[List[Tuple[str, float, float]], float]: ([(subfile_name, start, stop),], total_duration)
     """
     timestamps = sorted(timestamps, key=lambda x: x["start"])
-    content = wavio.read(file_path)
-    sr = content.rate
-    audio = np.squeeze(content.data)
+    audio, sr = readWav(file_path)
     basename = os.path.splitext(file_path)[0]
     # Create subfiles
     subfiles = []
     total_duration = 0.0
     for i, seg in enumerate(timestamps):
-        subfile_path = f"{basename}_{i}.wav"
-        offset = seg["start"]
         start = int(seg["start"] * sr)
         stop = int(seg["end"] * sr)
-        wavio.write(subfile_path, audio[start:stop], sr)
-        duration = (seg["end"] - seg["start"]) / sr
+        if write_subfiles:
+            subfile_path = f"{basename}_{i}.wav"
+            offset = seg["start"]
+            wavio.write(subfile_path, audio[start:stop], sr)
+            duration = seg["end"] - seg["start"]
+        else:
+            subfile_path, offset, duration = _subfile(file_path, None, audio, start, stop, sr, False)
         subfiles.append((subfile_path, offset, duration))
         total_duration += duration
 
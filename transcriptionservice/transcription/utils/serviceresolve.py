@@ -4,7 +4,8 @@ import logging
 import os
 
 from transcriptionservice.broker.discovery import (SERVICE_TYPES,
-                                                   list_available_services)
+                                                   queue_lengths,
+                                                   service_registry)
 
 
 class ResolveException(Exception):
@@ -77,6 +78,7 @@ class ServicePolicy:
     ANY = "any"  # If the asked service is not available, chooses any other similar service instead
     DEFAULT = "default"  # If the asked service is not available, uses the default service instead. If the default service is not available, throws an error.
     STRICT = "error"  # If the asked service is not available, throws an error.
+    LOAD = "load"  # Same as ANY, choosing the compatible service with the most spare capacity.
 
     @classmethod
     def from_env(cls) -> str:
@@ -86,7 +88,12 @@ class ServicePolicy:
             str: Environement defined resolve policy (default ANY)
         """
         env_policy = os.environ.get("RESOLVE_POLICY", "any").lower()
-        return {"default": cls.DEFAULT, "any": cls.ANY, "strict": cls.STRICT}.get(
+        return {
+            "default": cls.DEFAULT,
+            "any": cls.ANY,
+            "strict": cls.STRICT,
+            "load": cls.LOAD,
+        }.get(
             env_policy, cls.ANY
         )
 
@@ -95,7 +102,8 @@ class ServiceResolver:
     """The ServiceResolver class is used to fetch available services and resolve service configuration from transcrition requests."""
 
     def __init__(self):
-        self.subservices_list = list_available_services(ensure_alive=True)
+        self.subservices_list = service_registry.get()
+        self.is_fresh = service_registry.ttl <= 0
         self.service_policy = ServicePolicy.from_env()
         self.default_services = {}
         if self.service_policy == ServicePolicy.DEFAULT:
@@ -113,6 +121,18 @@ class ServiceResolver:
         Raises:
             NoServiceAvailable: No service exist to resolve this configuration.
         """
+        try:
+            return self._resolve_task(task_config)
+        except (NoServiceAvailable, ServiceUnavailable, DefaultUnavailable):
+            if self.is_fresh:
+                raise
+        # The cached service list may predate the service registration
+        logging.info("Failed to resolve using cached services, fetching services")
+        self.subservices_list = service_registry.refresh()
+        self.is_fresh = True
+        return self._resolve_task(task_config)
+
+    def _resolve_task(self, task_config: "TaskConfig") -> bool:
         service_type = task_config.service_type
         av_service_list = self.subservices_list[service_type]
 
@@ -133,6 +153,8 @@ class ServiceResolver:
                 raise NoServiceSpecified(service_type)
             if self.service_policy == ServicePolicy.DEFAULT:
                 resolving_service = self._resolve_default(service_type)
+            elif self.service_policy == ServicePolicy.LOAD:
+                resolving_service = self._resolve_load(service_type)
             else:
                 resolving_service = self._resolve_any(service_type)
 
@@ -162,6 +184,33 @@ class ServiceResolver:
         else:
             raise NoServiceAvailable(service_type=service_type)
 
+    def _resolve_load(self, service_type: str) -> "Service":
+        """Pick the compatible service with the most spare capacity.
+
+        Spare capacity is the total concurrency of the service instances minus the number of tasks
+        waiting in the service queue.
+
+        Args:
+            service_type (str): Type of service specified in SERVICE_TYPES
+
+        Raises:
+            NoServiceAvailable: No running instance exist for the service_type
+
+        Returns:
+            Service: Instance of Service
+        """
+        services = list(self.subservices_list[service_type].values())
+        if not services:
+            raise NoServiceAvailable(service_type=service_type)
+        if len(services) == 1:
+            return services[0]
+        try:
+            pending = queue_lengths([service.queue_name for service in services])
+        except Exception as error:
+            logging.warning(f"Failed to fetch queue lengths, falling back to ANY policy: {error}")
+            return services[0]
+        return max(services, key=lambda service: service.concurrency - pending[service.queue_name])
+
     def _resolve_default(self, service_type: str) -> "Service":
         default_service_name = self.default_services.get(service_type, False)
         if default_service_name:
@@ -42,6 +42,18 @@ class TaskProgression:
     def __init__(self, steps: List[Tuple[str, bool]]):
         self.steps = {name: StepProgression(required) for name, required in steps}
 
+    @classmethod
+    def fromDict(cls, progressDict: dict) -> "TaskProgression":
+        """Create TaskProgression from the dictionnary returned by toDict()"""
+        progression = TaskProgression(
+            [(name, value["required"]) for name, value in progressDict["steps"].items()]
+        )
+        for name, value in progressDict["steps"].items():
+            if value["required"]:
+                progression.steps[name].state = StepState(value["status"])
+                progression.steps[name].progress = value["progress"]
+        return progression
+
     def toDict(self) -> dict:
         ret = {"steps": {}}
         for name, value in self.steps.items():